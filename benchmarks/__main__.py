@@ -0,0 +1,246 @@
+'''Benchmark gptman against a local fake OpenAI server.
+
+    python -m benchmarks -o results.json
+    python -m benchmarks --latency 0.05 --rate-limit 50 --compare results.json
+
+Nothing is sent to OpenAI. Results are written as JSON so runs on different
+commits can be compared.
+'''
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import warnings
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+
+from argparse import Namespace
+
+from benchmarks.fake_server import FakeOpenAI
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('-o', '--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='print the ratio to results of a previous run')
+    parser.add_argument('--prompts', type=int, default=100, help='number of synthetic prompts')
+    parser.add_argument('--turns', type=int, default=20, help='number of shell turns')
+    parser.add_argument('--files', type=int, default=20, help='number of files to upload')
+    parser.add_argument('--file-size', type=int, default=256 * 1024, help='bytes per uploaded file')
+    parser.add_argument('-j', '--jobs', type=int, default=8, help='jobs for concurrent commands')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every request')
+    parser.add_argument('--run-duration', type=float, default=0.1, help='seconds until a run completes')
+    parser.add_argument('--rate-limit', type=int, help='requests per second before 429 responses')
+    return parser.parse_args(argv)
+
+
+def timed(func, *args, **kwargs):
+    '''Call the function with stdout silenced and return the elapsed seconds.
+
+    Commands exit with status 1 on failures, the exception is returned as
+    the result in that case so the failure is reported instead of ending
+    the benchmark.
+    '''
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            result = func(*args, **kwargs)
+        except SystemExit as ex:
+            result = ex
+    return time.perf_counter() - started, result
+
+
+def summarize(seconds, count, requests=None):
+    result = {
+        'seconds': round(seconds, 4),
+        'count': count,
+        'per_second': round(count / seconds, 2) if seconds else None,
+    }
+    if requests is not None:
+        result['requests'] = requests
+    return result
+
+
+def counting_requests(fake, func, *args, **kwargs):
+    before = fake.request_count
+    seconds, result = timed(func, *args, **kwargs)
+    if isinstance(result, SystemExit):
+        print(f'{func.__name__} failed, see the requests and rate_limited counts', file=sys.stderr)
+    return seconds, result, fake.request_count - before
+
+
+def make_push_args(jobs, force=False):
+    return Namespace(path=None, profile=None, profiles=None, jobs=jobs, force=force, diff=False,
+                     include=None, exclude=None)
+
+
+def write_prompts(count, suffix=''):
+    for i in range(count):
+        with open(f'prompt-{i:04d}.md', 'w') as fout:
+            fout.write(f'---\nname: bench-{i:04d}\nmodel: gpt-4o-mini\n---\nYou are assistant {i}.{suffix}\n')
+
+
+def bench_push_pull(fake, args):
+    from gptman.assistant import cli
+
+    results = {}
+    write_prompts(args.prompts)
+    for name, jobs in [('push_create', 1), ('push_create_jobs', args.jobs)]:
+        if name == 'push_create_jobs':
+            for filename in os.listdir('.'):
+                if filename.endswith('.md'):
+                    os.remove(filename)
+            write_prompts(args.prompts)
+        push_args = make_push_args(jobs)
+        seconds, _, requests = counting_requests(fake, cli.push, push_args)
+        results[name] = summarize(seconds, args.prompts, requests)
+
+    push_args = make_push_args(args.jobs)
+    seconds, _, requests = counting_requests(fake, cli.push, push_args)
+    results['push_unchanged'] = summarize(seconds, args.prompts, requests)
+
+    push_args = make_push_args(args.jobs, force=True)
+    seconds, _, requests = counting_requests(fake, cli.push, push_args)
+    results['push_force'] = summarize(seconds, args.prompts, requests)
+
+    for filename in os.listdir('.'):
+        if filename.endswith('.md'):
+            os.remove(filename)
+    pull_args = Namespace(profile=None, jobs=args.jobs, include=None, exclude=None)
+    seconds, _, requests = counting_requests(fake, cli.pull, pull_args)
+    results['pull_create'] = summarize(seconds, len(fake.assistants), requests)
+
+    seconds, _, requests = counting_requests(fake, cli.pull, pull_args)
+    results['pull_unchanged'] = summarize(seconds, len(fake.assistants), requests)
+    return results
+
+
+def bench_turns(fake, args):
+    from gptman.main import get_client
+    from gptman.assistant import create_assistant, send_message
+    from gptman.assistant.polling import PollingPolicy
+
+    client = get_client()
+    asst = create_assistant(client, name='bench-shell', model='gpt-4o-mini')
+    thread = client.beta.threads.create()
+    policy = PollingPolicy(initial_interval=0.05)
+
+    latencies = []
+    before = fake.request_count
+    for i in range(args.turns):
+        seconds, _ = timed(send_message, client, asst.id, thread, f'Turn {i}', policy=policy)
+        latencies.append(seconds)
+    requests = fake.request_count - before
+
+    return {
+        'turn': {
+            'count': args.turns,
+            'requests': requests,
+            'p50_seconds': round(statistics.median(latencies), 4),
+            'p95_seconds': round(statistics.quantiles(latencies, n=20)[-1], 4),
+            'mean_seconds': round(statistics.mean(latencies), 4),
+        },
+    }
+
+
+def bench_uploads(fake, args):
+    from gptman.main import get_client
+    from gptman.assistant.uploads import UploadIndex, upload_files
+
+    client = get_client()
+    os.makedirs('uploads')
+    paths = []
+    for i in range(args.files):
+        path = os.path.join('uploads', f'file-{i:04d}.txt')
+        with open(path, 'wb') as fout:
+            fout.write(os.urandom(args.file_size))
+        paths.append(path)
+
+    results = {}
+    index = UploadIndex()
+    for name in ['upload', 'upload_reused']:
+        before = fake.request_count
+        seconds, outcomes = timed(lambda: list(upload_files(client, paths, index=index, jobs=args.jobs)))
+        failed = sum(1 for outcome in outcomes if outcome.error)
+        result = summarize(seconds, args.files, fake.request_count - before)
+        result['failed'] = failed
+        result['megabytes_per_second'] = round(args.files * args.file_size / seconds / 2 ** 20, 2)
+        results[name] = result
+    return results
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    fake = FakeOpenAI(latency=args.latency, run_duration=args.run_duration, rate_limit=args.rate_limit)
+    results = {}
+    with fake, tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        os.environ['GPTMAN_CACHE_DIR'] = os.path.join(workdir, 'cache')
+        os.environ.pop('GPTMAN_PROFILE', None)
+        try:
+            with open('gptman.toml', 'w') as fout:
+                fout.write(f'[gptman]\napi_key = "fake"\nbase_url = "{fake.base_url}"\n')
+
+            for bench in [bench_push_pull, bench_turns, bench_uploads]:
+                results.update(bench(fake, args))
+        finally:
+            os.chdir(cwd)
+
+    return {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'created_at': int(time.time()),
+        'params': {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ('output', 'compare')
+        },
+        'rate_limited': fake.rate_limited_count,
+        'results': results,
+    }
+
+
+def compare(report, previous):
+    for name, result in report['results'].items():
+        before = previous['results'].get(name)
+        if not before:
+            continue
+        key = 'seconds' if 'seconds' in result else 'p50_seconds'
+        ratio = result[key] / before[key] if before[key] else float('nan')
+        print(f'{name:20} {before[key]:10.4f} -> {result[key]:10.4f} ({ratio:.2f}x)')
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    warnings.simplefilter('ignore', DeprecationWarning)
+    report = run(args)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fout:
+            fout.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as fin:
+            compare(report, json.load(fin))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,313 @@
+'''In-process stand-in for the parts of the OpenAI API used by gptman.
+
+It keeps assistants, threads, messages, runs and files in memory. Every
+request can be delayed by `latency` seconds, runs complete `run_duration`
+seconds after they are created, and requests over `rate_limit` per second
+are answered with 429 like the real API.
+'''
+import re
+import json
+import time
+import itertools
+import threading
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeOpenAI:
+    def __init__(self, latency=0.0, run_duration=0.0, rate_limit=None):
+        self.latency = latency
+        self.run_duration = run_duration
+        self.rate_limit = rate_limit
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+        self.assistants = {}
+        self.threads = {}
+        self.messages = {}
+        self.runs = {}
+        self.files = {}
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self.window = (0, 0)
+        self.server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}/v1'
+
+    def start(self):
+        fake = self
+
+        class Handler(RequestHandler):
+            api = fake
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def new_id(self, prefix):
+        return f'{prefix}_{next(self.counter):08d}'
+
+    def allow_request(self):
+        '''Fixed one second window, enough to exercise 429 handling.
+
+        Returns whether the request is allowed and the rate limit headers.
+        '''
+        with self.lock:
+            self.request_count += 1
+            if not self.rate_limit:
+                return True, {}
+
+            now = time.monotonic()
+            start, count = self.window
+            if start != int(now):
+                start, count = int(now), 0
+            self.window = (start, count + 1)
+            headers = {
+                'x-ratelimit-limit-requests': str(self.rate_limit * 60),
+                'x-ratelimit-remaining-requests': str(max(0, self.rate_limit - count - 1)),
+                'x-ratelimit-reset-requests': f'{int((start + 1 - now) * 1000)}ms',
+            }
+            if count < self.rate_limit:
+                return True, headers
+            self.rate_limited_count += 1
+            return False, {**headers, 'retry-after-ms': str(int((start + 1 - now) * 1000))}
+
+    # Assistants
+
+    def create_assistant(self, body):
+        asst = {
+            'id': self.new_id('asst'),
+            'object': 'assistant',
+            'created_at': int(time.time()),
+            'name': None,
+            'description': None,
+            'model': 'gpt-4o-mini',
+            'instructions': None,
+            'tools': [],
+            'metadata': {},
+            **body,
+        }
+        self.assistants[asst['id']] = asst
+        return asst
+
+    def update_assistant(self, asst_id, body):
+        self.assistants[asst_id].update(body)
+        return self.assistants[asst_id]
+
+    # Threads and runs
+
+    def create_thread(self, body):
+        thread = {
+            'id': self.new_id('thread'),
+            'object': 'thread',
+            'created_at': int(time.time()),
+            'metadata': {},
+        }
+        self.threads[thread['id']] = thread
+        self.messages[thread['id']] = []
+        for message in body.get('messages') or []:
+            self.create_message(thread['id'], message)
+        return thread
+
+    def create_message(self, thread_id, body, run_id=None, assistant_id=None):
+        content = body['content']
+        if isinstance(content, str):
+            content = [{'type': 'text', 'text': {'value': content, 'annotations': []}}]
+        message = {
+            'id': self.new_id('msg'),
+            'object': 'thread.message',
+            'created_at': int(time.time()),
+            'thread_id': thread_id,
+            'role': body.get('role', 'user'),
+            'content': content,
+            'attachments': body.get('attachments') or [],
+            'assistant_id': assistant_id,
+            'run_id': run_id,
+            'status': 'completed',
+            'metadata': {},
+        }
+        self.messages[thread_id].append(message)
+        return message
+
+    def create_run(self, thread_id, body):
+        for message in body.get('additional_messages') or []:
+            self.create_message(thread_id, message)
+
+        run = {
+            'id': self.new_id('run'),
+            'object': 'thread.run',
+            'created_at': int(time.time()),
+            'thread_id': thread_id,
+            'assistant_id': body['assistant_id'],
+            'status': 'queued',
+            'model': 'gpt-4o-mini',
+            'instructions': '',
+            'tools': [],
+            'parallel_tool_calls': True,
+            'usage': None,
+            'last_error': None,
+            'incomplete_details': None,
+            '_completes_at': time.monotonic() + self.run_duration,
+        }
+        self.runs[run['id']] = run
+        return self.render_run(run)
+
+    def render_run(self, run):
+        if run['status'] == 'queued' and time.monotonic() >= run['_completes_at']:
+            last = self.messages[run['thread_id']][-1] if self.messages[run['thread_id']] else None
+            text = last['content'][0]['text']['value'] if last else ''
+            self.create_message(
+                run['thread_id'],
+                {'role': 'assistant', 'content': f'Echo: {text}'},
+                run_id=run['id'],
+                assistant_id=run['assistant_id'],
+            )
+            run['status'] = 'completed'
+            run['usage'] = {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15}
+        return {k: v for k, v in run.items() if not k.startswith('_')}
+
+    # Files
+
+    def create_file(self, body, content_type):
+        match = re.search(rb'filename="([^"]*)"', body)
+        purpose = re.search(rb'name="purpose"\r\n\r\n([^\r]*)', body)
+        file_obj = {
+            'id': self.new_id('file'),
+            'object': 'file',
+            'bytes': len(body),
+            'created_at': int(time.time()),
+            'filename': match.group(1).decode() if match else 'file',
+            'purpose': purpose.group(1).decode() if purpose else 'assistants',
+            'status': 'processed',
+        }
+        self.files[file_obj['id']] = file_obj
+        return file_obj
+
+
+def paginate(items, query):
+    limit = int(query.get('limit', ['20'])[0])
+    if query.get('order', ['desc'])[0] == 'desc':
+        items = list(reversed(items))
+    after = query.get('after', [None])[0]
+    if after:
+        ids = [item['id'] for item in items]
+        items = items[ids.index(after) + 1:] if after in ids else []
+    page = items[:limit]
+    return {
+        'object': 'list',
+        'data': page,
+        'first_id': page[0]['id'] if page else None,
+        'last_id': page[-1]['id'] if page else None,
+        'has_more': len(items) > limit,
+    }
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    api = None
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, data, headers=None):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def handle_request(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+
+        if self.api.latency:
+            time.sleep(self.api.latency)
+
+        allowed, headers = self.api.allow_request()
+        if not allowed:
+            self.send_json(429, {'error': {'message': 'Rate limit exceeded', 'type': 'requests'}}, headers)
+            return
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split('/') if part][1:]
+        content_type = self.headers.get('Content-Type', '')
+        body = json.loads(raw_body) if raw_body and 'json' in content_type else {}
+
+        try:
+            with self.api.lock:
+                status, data = self.route(method, parts, query, body, raw_body, content_type)
+        except KeyError:
+            status, data = 404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}}
+        self.send_json(status, data, headers)
+
+    def route(self, method, parts, query, body, raw_body, content_type):
+        api = self.api
+        match method, parts:
+            case 'GET', ['assistants']:
+                return 200, paginate(list(api.assistants.values()), query)
+            case 'POST', ['assistants']:
+                return 200, api.create_assistant(body)
+            case 'GET', ['assistants', asst_id]:
+                return 200, api.assistants[asst_id]
+            case 'POST', ['assistants', asst_id]:
+                return 200, api.update_assistant(asst_id, body)
+            case 'POST', ['threads']:
+                return 200, api.create_thread(body)
+            case 'POST', ['threads', 'runs']:
+                thread = api.create_thread(body.pop('thread', {}))
+                return 200, api.create_run(thread['id'], body)
+            case 'DELETE', ['threads', thread_id]:
+                del api.threads[thread_id]
+                return 200, {'id': thread_id, 'object': 'thread.deleted', 'deleted': True}
+            case 'GET', ['threads', thread_id, 'messages']:
+                messages = api.messages[thread_id]
+                if 'run_id' in query:
+                    messages = [m for m in messages if m['run_id'] == query['run_id'][0]]
+                return 200, paginate(messages, query)
+            case 'POST', ['threads', thread_id, 'messages']:
+                return 200, api.create_message(thread_id, body)
+            case 'POST', ['threads', thread_id, 'runs']:
+                return 200, api.create_run(thread_id, body)
+            case 'GET', ['threads', thread_id, 'runs', run_id]:
+                return 200, api.render_run(api.runs[run_id])
+            case 'POST', ['threads', thread_id, 'runs', run_id, 'cancel']:
+                api.runs[run_id]['status'] = 'cancelled'
+                return 200, api.render_run(api.runs[run_id])
+            case 'GET', ['files']:
+                return 200, paginate(list(api.files.values()), query)
+            case 'POST', ['files']:
+                return 200, api.create_file(raw_body, content_type)
+            case 'GET', ['files', file_id]:
+                return 200, api.files[file_id]
+            case 'DELETE', ['files', file_id]:
+                del api.files[file_id]
+                return 200, {'id': file_id, 'object': 'file', 'deleted': True}
+        return 404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}}
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
@@ -1,10 +1,17 @@
-import time
+from __future__ import annotations
+
+import os
 import logging
 
-import openai
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    import openai
 
-from typing import List, Optional
 from gptman import exceptions as exc
+from gptman.instrument import record_run
+from gptman.assistant.polling import PollingPolicy, poll_run, cancel_run
+from gptman.assistant.multipart import MULTIPART_THRESHOLD, upload_large_file
 
 
 logger = logging.getLogger('gptman')
@@ -22,8 +29,8 @@ def create_assistant(client: openai.OpenAI, **kwargs):
     return client.beta.assistants.create(**kwargs)
 
 
-def list_assistants(client: openai.OpenAI):
-    paginator = client.beta.assistants.list()
+def list_assistants(client: openai.OpenAI, limit=100):
+    paginator = client.beta.assistants.list(limit=limit)
     for assistant in paginator:
         yield assistant
 
@@ -32,32 +39,162 @@ def describe_assistant(client: openai.OpenAI, asst_id: str):
     return client.beta.assistants.retrieve(assistant_id=asst_id)
 
 
-def run_assistant(client: openai.OpenAI, asst_id, thread, timeout=60):
+def run_assistant(client: openai.OpenAI, asst_id, thread, timeout=60, policy=None, cache=None,
+                  additional_messages=None):
+    '''Run the assistant on the thread and return the generated content.
+
+    `additional_messages` are added to the thread by the run request itself,
+    which saves a round trip compared to creating the messages first.
+    '''
+    if cache:
+        cache_key, cached = lookup_cache(client, asst_id, thread, cache, additional_messages)
+        if cached is not None:
+            return cached
+
     print('.', end='', flush=True)
-    run_obj = client.beta.threads.runs.create_and_poll(
+    kwargs = {'additional_messages': additional_messages} if additional_messages else {}
+    run_obj = client.beta.threads.runs.create(
         thread_id=thread.id,
         assistant_id=asst_id,
+        **kwargs,
     )
+    logger.debug(run_obj)
+
+    policy = policy or PollingPolicy(timeout=timeout)
+    run_obj = poll_run(client, run_obj, policy, on_poll=lambda _: print('.', end='', flush=True))
+
+    print('.', flush=True)
+    generated_content = get_run_content(client, run_obj)
+    logger.debug(generated_content)
+    if cache:
+        cache.set(cache_key, generated_content)
+    return generated_content
+
+
+def stream_assistant(client: openai.OpenAI, asst_id, thread, on_text=None, cache=None,
+                     additional_messages=None):
+    '''Run the assistant on the thread, streaming the response.
+
+    Text deltas are passed to `on_text` as they arrive (printed to stdout by
+    default) and the whole generated content is returned once the run ends.
+    '''
+    on_text = on_text or print_text_delta
 
-    interval = 1
-    for _ in range(int(timeout / interval)):
+    if cache:
+        cache_key, cached = lookup_cache(client, asst_id, thread, cache, additional_messages)
+        if cached is not None:
+            on_text(cached)
+            return cached
+
+    kwargs = {'additional_messages': additional_messages} if additional_messages else {}
+    with client.beta.threads.runs.stream(
+        thread_id=thread.id,
+        assistant_id=asst_id,
+        **kwargs,
+    ) as stream:
+        try:
+            for delta in stream.text_deltas:
+                on_text(delta)
+        except KeyboardInterrupt:
+            if stream.current_run:
+                cancel_run(client, stream.current_run)
+            raise
+
+        run_obj = stream.get_final_run()
         logger.debug(run_obj)
-        if run_obj.status == 'completed':
-            print('.', flush=True)
-            generated_content = get_generated_content(client, thread)
-            logger.debug(generated_content)
-            return generated_content
+        record_run(run_obj)
+        if run_obj.status != 'completed':
+            raise exc.RunFailed(run_obj)
+        messages = stream.get_final_messages()
+
+    generated_content = '\n\n'.join(
+        format_message_content(message)
+        for message in messages
+        if message.role == 'assistant'
+    )
+    logger.debug(generated_content)
+    if cache:
+        cache.set(cache_key, generated_content)
+    return generated_content
+
+
+def lookup_cache(client: openai.OpenAI, asst_id, thread, cache, additional_messages=None):
+    '''Look up a cached response for running the assistant on the thread.
+
+    On a hit the additional messages and the response are added to the
+    thread, so the conversation continues as if the run had happened.
+    '''
+    messages = list_thread_messages(client, thread) + [
+        (
+            message['role'],
+            format_message_param(message['content']),
+            [attachment['file_id'] for attachment in message.get('attachments') or []],
+        )
+        for message in additional_messages or []
+    ]
+    cache_key = cache.make_key(client, asst_id, messages)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        logger.debug('Cache hit %s', cache_key)
+        for message in additional_messages or []:
+            client.beta.threads.messages.create(thread_id=thread.id, **message)
+        client.beta.threads.messages.create(
+            thread_id=thread.id,
+            role='assistant',
+            content=cached,
+        )
+    return cache_key, cached
 
-        time.sleep(interval)
-        print('.', end='', flush=True)
 
-    raise exc.RequestTimeout(run_obj)
+def list_thread_messages(client: openai.OpenAI, thread):
+    return [
+        (
+            message.role,
+            format_message_content(message),
+            [attachment.file_id for attachment in message.attachments or []],
+        )
+        for message in client.beta.threads.messages.list(thread_id=thread.id, order='asc', limit=100)
+    ]
+
+
+def format_message_param(content):
+    if isinstance(content, str):
+        return content
+
+    MAP = {
+        'image_file': lambda v: v['image_file']['file_id'],
+        'image_url': lambda v: v['image_url']['url'],
+        'text': lambda v: v['text'],
+    }
+    return '\n\n'.join(MAP[block['type']](block) for block in content)
+
+
+def print_text_delta(delta):
+    print(delta, end='', flush=True)
 
 
 def get_generated_content(client: openai.OpenAI, thread):
-    messages = client.beta.threads.messages.list(thread_id=thread.id)
+    messages = client.beta.threads.messages.list(thread_id=thread.id, order='desc', limit=1)
     last_message = messages.data[0]
+    return format_message_content(last_message)
+
+
+def get_run_content(client: openai.OpenAI, run_obj, limit=20):
+    '''Fetch only the messages the run generated, newest first.'''
+    messages = client.beta.threads.messages.list(
+        thread_id=run_obj.thread_id,
+        run_id=run_obj.id,
+        order='desc',
+        limit=limit,
+    )
+    return '\n\n'.join(
+        format_message_content(message)
+        for message in reversed(messages.data)
+        if message.role == 'assistant'
+    )
 
+
+def format_message_content(message):
     MAP = {
         'ImageFileContentBlock': lambda v: v.image_file.file_id,
         'ImageURLContentBlock': lambda v: v.image_url.url,
@@ -66,31 +203,41 @@ def get_generated_content(client: openai.OpenAI, thread):
 
     value = '\n\n'.join([
         MAP[type(content).__name__](content)
-        for content in last_message.content
+        for content in message.content
     ])
     return value
 
 
-def send_message(client: openai.OpenAI, assistant_id, thread, content, attachments=None, file_ids=None):
-    kwargs = {
-        'thread_id': thread.id,
+def send_message(client: openai.OpenAI, assistant_id, thread, content, attachments=None, file_ids=None,
+                 stream=False, on_text=None, policy=None, cache=None):
+    message = {
         'role': 'user',
         'content': content,
     }
     if attachments:
-        kwargs['attachments'] = attachments
+        message['attachments'] = attachments
 
     if file_ids:
-        kwargs['file_ids'] = file_ids
-
-    message = client.beta.threads.messages.create(**kwargs)
-    logger.debug(message)
-
-    generated_message = run_assistant(client, assistant_id, thread)
+        # file_ids is not accepted as an additional message of a run
+        created = client.beta.threads.messages.create(thread_id=thread.id, file_ids=file_ids, **message)
+        logger.debug(created)
+        additional_messages = None
+    else:
+        additional_messages = [message]
+
+    if stream:
+        return stream_assistant(client, assistant_id, thread, on_text=on_text, cache=cache,
+                                additional_messages=additional_messages)
+
+    generated_message = run_assistant(client, assistant_id, thread, policy=policy, cache=cache,
+                                      additional_messages=additional_messages)
     return generated_message
 
 
 def attach_file(client: openai.OpenAI, path, purpose='assistants'):
+    if os.path.getsize(path) > MULTIPART_THRESHOLD:
+        return upload_large_file(client, path, purpose=purpose)
+
     with open(path, 'rb') as fin:
         message_file = client.files.create(
             file=fin, purpose=purpose
@@ -105,3 +252,7 @@ def delete_file(client: openai.OpenAI, file_id):
 
 def list_files(client: openai.OpenAI):
     return client.files.list()
+
+
+def retrieve_file(client: openai.OpenAI, file_id):
+    return client.files.retrieve(file_id)
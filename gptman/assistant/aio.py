@@ -0,0 +1,195 @@
+'''Asynchronous twins of the `gptman.assistant` helpers.
+
+They take an `openai.AsyncOpenAI` (or `AsyncAzureOpenAI`) client, which is
+returned by `get_client(async_=True)`, so many runs can share one event
+loop. Unlike the synchronous helpers nothing is printed to the terminal.
+'''
+import time
+import asyncio
+import logging
+
+import openai
+
+from gptman import exceptions as exc
+from gptman.instrument import record_run
+from gptman.assistant import format_message_content
+from gptman.assistant.polling import (
+    PollingPolicy,
+    FAILED_STATUSES,
+    TERMINAL_STATUSES,
+)
+
+
+logger = logging.getLogger('gptman')
+
+
+async def update_instruction(client: openai.AsyncOpenAI, asst_id: str, **kwargs):
+    tools = kwargs.pop('tools', None)
+    if tools:
+        kwargs['tools'] = [{'type': tool_type} for tool_type in tools.split(' ')]
+
+    return await client.beta.assistants.update(asst_id, **kwargs)
+
+
+async def create_assistant(client: openai.AsyncOpenAI, **kwargs):
+    return await client.beta.assistants.create(**kwargs)
+
+
+async def list_assistants(client: openai.AsyncOpenAI, limit=100):
+    async for assistant in client.beta.assistants.list(limit=limit):
+        yield assistant
+
+
+async def describe_assistant(client: openai.AsyncOpenAI, asst_id: str):
+    return await client.beta.assistants.retrieve(assistant_id=asst_id)
+
+
+async def run_assistant(client: openai.AsyncOpenAI, asst_id, thread, timeout=60, policy=None,
+                        additional_messages=None):
+    kwargs = {'additional_messages': additional_messages} if additional_messages else {}
+    run_obj = await client.beta.threads.runs.create(
+        thread_id=thread.id,
+        assistant_id=asst_id,
+        **kwargs,
+    )
+    logger.debug(run_obj)
+
+    run_obj = await poll_run(client, run_obj, policy or PollingPolicy(timeout=timeout))
+
+    generated_content = await get_run_content(client, run_obj)
+    logger.debug(generated_content)
+    return generated_content
+
+
+async def poll_run(client: openai.AsyncOpenAI, run_obj, policy=None):
+    '''Poll the run until it reaches a terminal status.
+
+    Works like `gptman.assistant.polling.poll_run`, and the run is also
+    cancelled when the awaiting task is cancelled.
+    '''
+    policy = policy or PollingPolicy()
+    deadline = time.monotonic() + policy.timeout
+    intervals = policy.intervals()
+
+    try:
+        while run_obj.status not in TERMINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                await cancel_run(client, run_obj)
+                raise exc.RequestTimeout(run_obj)
+
+            await asyncio.sleep(min(next(intervals), remaining))
+            run_obj = await client.beta.threads.runs.retrieve(run_obj.id, thread_id=run_obj.thread_id)
+            logger.debug(run_obj)
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        await asyncio.shield(cancel_run(client, run_obj))
+        raise
+
+    record_run(run_obj)
+
+    if run_obj.status == 'requires_action':
+        await cancel_run(client, run_obj)
+
+    if run_obj.status in FAILED_STATUSES:
+        raise exc.RunFailed(run_obj)
+
+    return run_obj
+
+
+async def cancel_run(client: openai.AsyncOpenAI, run_obj):
+    try:
+        await client.beta.threads.runs.cancel(run_obj.id, thread_id=run_obj.thread_id)
+        logger.info('Cancelled run %s', run_obj.id)
+    except openai.OpenAIError as ex:
+        logger.warning('Failed to cancel run %s: %s', run_obj.id, ex)
+
+
+async def stream_assistant(client: openai.AsyncOpenAI, asst_id, thread, on_text=None, additional_messages=None):
+    kwargs = {'additional_messages': additional_messages} if additional_messages else {}
+    async with client.beta.threads.runs.stream(
+        thread_id=thread.id,
+        assistant_id=asst_id,
+        **kwargs,
+    ) as stream:
+        try:
+            async for delta in stream.text_deltas:
+                if on_text:
+                    on_text(delta)
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            if stream.current_run:
+                await asyncio.shield(cancel_run(client, stream.current_run))
+            raise
+
+        run_obj = await stream.get_final_run()
+        logger.debug(run_obj)
+        record_run(run_obj)
+        if run_obj.status != 'completed':
+            raise exc.RunFailed(run_obj)
+        messages = await stream.get_final_messages()
+
+    return '\n\n'.join(
+        format_message_content(message)
+        for message in messages
+        if message.role == 'assistant'
+    )
+
+
+async def get_generated_content(client: openai.AsyncOpenAI, thread):
+    messages = await client.beta.threads.messages.list(thread_id=thread.id, order='desc', limit=1)
+    return format_message_content(messages.data[0])
+
+
+async def get_run_content(client: openai.AsyncOpenAI, run_obj, limit=20):
+    messages = await client.beta.threads.messages.list(
+        thread_id=run_obj.thread_id,
+        run_id=run_obj.id,
+        order='desc',
+        limit=limit,
+    )
+    return '\n\n'.join(
+        format_message_content(message)
+        for message in reversed(messages.data)
+        if message.role == 'assistant'
+    )
+
+
+async def send_message(client: openai.AsyncOpenAI, assistant_id, thread, content, attachments=None, file_ids=None,
+                       stream=False, on_text=None, policy=None):
+    message = {
+        'role': 'user',
+        'content': content,
+    }
+    if attachments:
+        message['attachments'] = attachments
+
+    if file_ids:
+        created = await client.beta.threads.messages.create(thread_id=thread.id, file_ids=file_ids, **message)
+        logger.debug(created)
+        additional_messages = None
+    else:
+        additional_messages = [message]
+
+    if stream:
+        return await stream_assistant(client, assistant_id, thread, on_text=on_text,
+                                      additional_messages=additional_messages)
+
+    return await run_assistant(client, assistant_id, thread, policy=policy,
+                               additional_messages=additional_messages)
+
+
+async def attach_file(client: openai.AsyncOpenAI, path, purpose='assistants'):
+    with open(path, 'rb') as fin:
+        message_file = await client.files.create(
+            file=fin, purpose=purpose
+        )
+        logger.debug(message_file)
+        return message_file
+
+
+async def delete_file(client: openai.AsyncOpenAI, file_id):
+    return await client.files.delete(file_id)
+
+
+async def list_files(client: openai.AsyncOpenAI):
+    async for file_obj in client.files.list():
+        yield file_obj
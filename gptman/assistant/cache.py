@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+import openai
+
+from gptman.main import get_cache_dir
+
+
+logger = logging.getLogger('gptman')
+
+
+class ResponseCache:
+    '''Generated responses stored in SQLite, keyed by assistant and input.
+
+    The key covers the assistant's model, instructions and tools and the
+    messages of the thread, so a changed prompt never hits a stale entry.
+    Entries expire after `ttl` seconds and the least recently used ones are
+    evicted once the cache grows over `max_size` bytes. It can be set per
+    profile in gptman.toml:
+
+        [gptman.cache]
+        max_size = 104857600
+        ttl = 604800
+    '''
+
+    def __init__(self, path=None, max_size=100 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.path = path or os.path.join(get_cache_dir(), 'responses.sqlite')
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                ' key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,'
+                ' created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+
+    @classmethod
+    def from_settings(cls, profile_settings, path=None):
+        return cls(path, **(profile_settings or {}).get('cache', {}))
+
+    def assistant_config(self, client: openai.OpenAI, asst_id):
+        '''Retrieve the assistant on each lookup, as it may be pushed while the cache is open.'''
+        asst = client.beta.assistants.retrieve(assistant_id=asst_id)
+        return {
+            'model': asst.model,
+            'instructions': asst.instructions,
+            'tools': [tool.type for tool in asst.tools or []],
+        }
+
+    def make_key(self, client: openai.OpenAI, asst_id, messages):
+        '''Key for running `asst_id` on messages, a list of (role, content).'''
+        payload = json.dumps({
+            'assistant': self.assistant_config(client, asst_id),
+            'messages': messages,
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                'SELECT value, created_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row and row[1] + self.ttl >= now:
+                self.conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+                self.hits += 1
+                return row[0]
+
+            if row:
+                self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self.misses += 1
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                (key, value, size, now, now),
+            )
+            self.conn.execute('DELETE FROM responses WHERE created_at + ? < ?', (self.ttl, now))
+            self.evict()
+
+    def evict(self):
+        total_size = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        rows = self.conn.execute('SELECT key, size FROM responses ORDER BY accessed_at')
+        for key, size in rows.fetchall():
+            if total_size <= self.max_size:
+                break
+            self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total_size -= size
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM responses')
+
+    def stats(self):
+        with self.lock:
+            count, size = self.conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses'
+            ).fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': count,
+            'size': size,
+        }
@@ -1,62 +1,250 @@
 import os
+import sys
+import json
 
+from collections import Counter
+from functools import partial
 from pathlib import Path
 
-from tabulate import tabulate
-
-from gptman.main import get_client
+from gptman import exceptions as exc
+from gptman.main import get_client, get_default_settings, get_profile_settings
+from gptman.workers import imap_ordered
 from gptman.assistant import (
     update_instruction,
     list_assistants,
     describe_assistant,
     create_assistant,
 )
-from gptman.assistant.shell import run_shell
-
+from gptman.assistant.polling import PollingPolicy
 from gptman.assistant.prompt import (
     read_prompt_file,
+    read_preamble,
     write_prompt_file,
+    sync_prompt_file,
+)
+from gptman.assistant.index import PromptIndex
+from gptman.assistant.ids import DEFAULT_PROFILE, AssistantIds, manifest_key
+from gptman.assistant.discover import DEFAULT_INCLUDE, find_prompt_files
+from gptman.assistant.includes import PromptBuild, has_includes, read_resolved_prompt_file
+from gptman.assistant.plan import (
+    index_assistants,
+    diff_prompt,
+    format_changes,
+)
+from gptman.assistant.manifest import (
+    prompt_digest,
+    read_manifest,
+    write_manifest,
+    is_unchanged,
+    record_push,
 )
 
+# The shell, the caches, evaluation and tabulate are imported by the commands
+# using them, as importing openai or the shell slows down every command.
+
+
+def find_prompts(args, build):
+    '''Prompt files given as the path argument, or found without the included fragments.'''
+    if args.path:
+        return args.path if isinstance(args.path, list) else [args.path]
+
+    return build.find_prompts(find_prompt_files(include=args.include, exclude=args.exclude))
+
 
 def push(args):
-    path = args.path or [
-        filename
-        for filename in os.listdir('.')
-        if filename.endswith('.md')
-    ]
+    if args.profiles:
+        return push_profiles(args)
+
+    build = PromptBuild()
+    paths = find_prompts(args, build)
 
     client = get_client(profile=args.profile)
+    manifest = read_manifest()
+    remote = index_assistants(list_assistants(client)) if args.diff else None
+
+    push_func = partial(push_prompt, client, manifest=manifest, force=args.force, remote=remote,
+                        build=build)
+    outcomes = imap_ordered(push_func, paths, jobs=args.jobs)
+
+    results = []
+    counter = Counter()
+    try:
+        for outcome in outcomes:
+            if outcome.error:
+                counter['fail'] += 1
+                print(f'error {outcome.item}: {outcome.error}')
+                continue
+
+            action, data, changes = outcome.result
+            counter[action] += 1
+            print(f"{action} {outcome.item} ---> {data.get('name')} ({data.get('id')})")
+            if changes:
+                print(format_changes(changes))
+            record_push(manifest, data['id'], prompt_digest(data), outcome.item)
+            results.append(data)
+    finally:
+        write_manifest(manifest)
+        build.save()
+
+    print(f"{counter['update']} updated, {counter['create']} created, "
+          f"{counter['skip']} unchanged, {counter['fail']} failed")
+
+    if counter['fail']:
+        sys.exit(1)
+
+    return results
+
+
+def push_profiles(args):
+    '''Push the prompts to several profiles concurrently and print a matrix of results.'''
+    from tabulate import tabulate
+
+    profiles = [profile.strip() for profile in args.profiles.split(',') if profile.strip()]
+    build = PromptBuild()
+    paths = find_prompts(args, build)
+
+    clients = {
+        profile: get_client(profile_settings=get_default_settings() if profile == DEFAULT_PROFILE
+                            else get_profile_settings(profile=profile))
+        for profile in profiles
+    }
+    remotes = {
+        profile: index_assistants(list_assistants(client)) if args.diff else None
+        for profile, client in clients.items()
+    }
+    manifest = read_manifest()
+    ids = AssistantIds()
+
+    def push_to_profile(item):
+        path, profile = item
+        return push_prompt(
+            clients[profile], path, manifest=manifest, force=args.force, remote=remotes[profile],
+            build=build,
+            ids=None if profile == DEFAULT_PROFILE else ids,
+            profile=profile,
+        )
+
+    items = [(path, profile) for path in paths for profile in profiles]
+    results = {}
+    errors = []
+    counter = Counter()
+    try:
+        for outcome in imap_ordered(push_to_profile, items, jobs=args.jobs * len(profiles)):
+            path, profile = outcome.item
+            if outcome.error:
+                counter['fail'] += 1
+                results[outcome.item] = 'error'
+                errors.append(f'error {path} ({profile}): {outcome.error}')
+                continue
+
+            action, data, _ = outcome.result
+            counter[action] += 1
+            results[outcome.item] = 'unchanged' if action == 'skip' else action
+            record_push(manifest, manifest_key(data['id'], profile), prompt_digest(data), path)
+    finally:
+        write_manifest(manifest)
+        ids.save()
+        build.save()
+
+    print(tabulate(
+        [[path] + [results[(path, profile)] for profile in profiles] for path in paths],
+        headers=['prompt'] + profiles,
+    ))
+    for error in errors:
+        print(error)
+
+    print(f"{counter['update']} updated, {counter['create']} created, "
+          f"{counter['skip']} unchanged, {counter['fail']} failed")
+
+    if counter['fail']:
+        sys.exit(1)
+
+    return results
+
+
+def push_prompt(client, path, manifest=None, force=False, remote=None, build=None, ids=None, profile=None):
+    '''Push a prompt file, creating the assistant if it has no id yet.
+
+    With `remote`, an index of assistants by id, only the fields which
+    differ from the remote assistant are sent. Otherwise `manifest` is used
+    to skip prompts which are unchanged since the last push. Includes are
+    resolved through `build`, which caches the resolved prompts. With
+    `ids`, the assistant id in `profile` is kept there instead of the
+    preamble.
+    '''
+    data = build.read(path) if build else read_resolved_prompt_file(path)[0]
+    asst_id = data.pop('id', None)
+    if ids is not None:
+        asst_id = ids.get(path, profile)
+
+    if asst_id and remote is not None:
+        if asst_id not in remote:
+            raise exc.AssistantNotFound(asst_id)
+
+        changes = diff_prompt(data, remote[asst_id])
+        if not changes:
+            return 'skip', {**data, 'id': asst_id}, changes
+
+        update_instruction(client, asst_id, **{field: data[field] for field in changes})
+        return 'update', {**data, 'id': asst_id}, changes
+
+    if asst_id and manifest and not force \
+            and is_unchanged(manifest, manifest_key(asst_id, profile), prompt_digest(data)):
+        return 'skip', {**data, 'id': asst_id}, None
+
+    if asst_id:
+        update_instruction(client, asst_id, **data)
+        return 'update', {**data, 'id': asst_id}, None
+
+    asst = create_assistant(client, **data)
+    if ids is not None:
+        ids.set(path, profile, asst.id)
+    else:
+        # Add the id to the file as written, keeping its include directives
+        write_prompt_file(path, {**read_prompt_file(path), 'id': asst.id})
+    return 'create', {**data, 'id': asst.id}, None
 
-    def push_prompt(path):
-        data = read_prompt_file(path)
-        print(f"update {path} ---> {data['name']} ({data.get('id')})")
 
+def plan(args):
+    build = PromptBuild()
+    paths = find_prompts(args, build)
+
+    client = get_client(profile=args.profile)
+    remote = index_assistants(list_assistants(client))
+
+    counter = Counter()
+    for _path in paths:
+        data = build.read(_path)
         asst_id = data.pop('id', None)
 
-        if asst_id:
-            return update_instruction(client, asst_id, **data)
+        if not asst_id:
+            counter['create'] += 1
+            print(f"create {_path} ---> {data.get('name')}")
+        elif asst_id not in remote:
+            counter['fail'] += 1
+            print(f'error {_path}: {exc.AssistantNotFound(asst_id)}')
         else:
-            asst = create_assistant(client, **data)
-            data_with_id = {**data, 'id': asst.id}
-            write_prompt_file(path, data_with_id)
+            changes = diff_prompt(data, remote[asst_id])
+            if changes:
+                counter['update'] += 1
+                print(f"update {_path} ---> {data.get('name')} ({asst_id})")
+                print(format_changes(changes))
+            else:
+                counter['skip'] += 1
 
-    paths = path if isinstance(path, list) else [path]
-    results = [push_prompt(_path) for _path in paths]
-    return results
+    build.save()
+    print(f"{counter['update']} to update, {counter['create']} to create, "
+          f"{counter['skip']} unchanged, {counter['fail']} not found")
+    return counter
 
 
 def pull(args):
-    prompt_filenames = [
-        name
-        for name in os.listdir('.')
-        if name.endswith('.md')
-    ]
+    prompt_filenames = find_prompt_files(include=args.include, exclude=args.exclude)
+    build = PromptBuild()
 
-    asst_id_to_filename = {
-        read_prompt_file(filename).get('id'): filename
-        for filename in prompt_filenames
-    }
+    prompt_index = PromptIndex()
+    asst_id_to_filename = prompt_index.id_to_filename(prompt_filenames)
+    prompt_index.save(prompt_filenames)
 
     def extract_data_from_assistant(asst):
         return {
@@ -70,7 +258,15 @@ def pull(args):
         filename = asst_id_to_filename.get(data['id']) \
             or '{}.md'.format(data['name'] or data['id'])
 
-        write_prompt_file(filename, data)
+        # The instructions of a file with includes are never flattened, only its preamble is pulled
+        if os.path.exists(filename) and has_includes(filename):
+            resolved = build.read(filename).get('instructions') or ''
+            if resolved.strip() != (data['instructions'] or '').strip():
+                print(f'warning {filename}: remote instructions differ from the resolved includes, '
+                      'pull the preamble only')
+            return sync_prompt_file(filename, {k: v for k, v in data.items() if k != 'instructions'})
+
+        return sync_prompt_file(filename, data)
 
     client = get_client(profile=args.profile)
     assistants = list_assistants(client)
@@ -78,20 +274,80 @@ def pull(args):
         extract_data_from_assistant(asst)
         for asst in assistants
     ]
-    return [
-        update_or_create_prompt(asst_data)
-        for asst_data in asst_data_list
-    ]
+
+    counter = Counter()
+    for outcome in imap_ordered(update_or_create_prompt, asst_data_list, jobs=args.jobs):
+        if outcome.error:
+            counter['fail'] += 1
+            print(f"error {outcome.item['id']}: {outcome.error}")
+        else:
+            counter[outcome.result] += 1
+
+    build.save()
+    print(f"{counter['create']} created, {counter['update']} updated, "
+          f"{counter['unchanged']} unchanged, {counter['fail']} failed")
+
+    if counter['fail']:
+        sys.exit(1)
+
+    return counter
+
+
+def watch(args):
+    from gptman.assistant.watch import watch as watch_prompts
+
+    client = get_client(profile=args.profile)
+    manifest = read_manifest()
+    build = PromptBuild()
+    build.find_prompts(find_prompt_files(include=args.include, exclude=args.exclude))
+    push_func = partial(push_prompt, client, manifest=manifest, build=build)
+
+    def push_changed(paths):
+        # A changed fragment pushes the prompts including it instead
+        targets = sorted((set(paths) | set(build.dependents(paths))) - build.fragments())
+        for outcome in imap_ordered(push_func, targets, jobs=args.jobs):
+            if isinstance(outcome.error, exc.PreambleNotFound):
+                # Not a prompt, possibly a fragment not included yet
+                continue
+            if outcome.error:
+                print(f'error {outcome.item}: {outcome.error}')
+                continue
+
+            action, data, _ = outcome.result
+            record_push(manifest, data['id'], prompt_digest(data), outcome.item)
+            # Saving a file without changes, or the id written by a create, is not reported
+            if action != 'skip':
+                print(f"{action} {outcome.item} ---> {data.get('name')} ({data.get('id')})")
+        write_manifest(manifest)
+        build.save()
+
+    # Fragments may be outside the prompt files, e.g. in a shared directory
+    include = (args.include or DEFAULT_INCLUDE) + sorted(build.fragments())
+
+    print('Watching prompt files, press Ctrl-C to stop')
+    try:
+        watch_prompts('.', push_changed, include=include, exclude=args.exclude,
+                      debounce=args.debounce)
+    except KeyboardInterrupt:
+        pass
 
 
 def shell(args):
-    asst_id = args.id or read_prompt_file(args.path)['id'] if args.path else None
+    from gptman.assistant.shell import run_shell
+    from gptman.assistant.cache import ResponseCache
+
+    asst_id = args.id or (read_preamble(args.path)['id'] if args.path else None)
 
     client = get_client(profile=args.profile)
-    run_shell(client, asst_id)
+    profile_settings = get_profile_settings(profile=args.profile)
+    policy = PollingPolicy.from_settings(profile_settings)
+    cache = ResponseCache.from_settings(profile_settings) if args.cache else None
+    run_shell(client, asst_id, policy=policy, cache=cache, warm_threads=args.warm_threads)
 
 
 def list_asst(args):
+    from tabulate import tabulate
+
     client = get_client(profile=args.profile)
 
     data = [('name', 'id')]
@@ -104,28 +360,127 @@ def list_asst(args):
 
 
 def describe(args):
-    asst_id = args.id or read_prompt_file(args.path)['id']
+    asst_id = args.id or read_preamble(args.path)['id']
 
-    client = get_client()
+    client = get_client(profile=args.profile)
     response = describe_assistant(client, asst_id)
     for asst_id, asst_name in response:
         print(f'{asst_name} [{asst_id}]')
 
 
+def evaluate(args):
+    from gptman.assistant.cache import ResponseCache
+    from gptman.assistant.evaluate import read_cases, read_finished, run_case
+
+    asst_ids = [
+        read_preamble(target)['id'] if target.endswith('.md') else target
+        for target in args.assistant
+    ]
+
+    client = get_client(profile=args.profile)
+    profile_settings = get_profile_settings(profile=args.profile)
+    policy = PollingPolicy.from_settings(profile_settings)
+    cache = ResponseCache.from_settings(profile_settings) if args.cache else None
+    finished = read_finished(args.output)
+
+    pending = (
+        (case, asst_id)
+        for case in read_cases(args.dataset)
+        for asst_id in asst_ids
+        if (case['id'], asst_id) not in finished
+    )
+
+    def run_pending(item):
+        case, asst_id = item
+        return run_case(client, asst_id, case, policy, cache)
+
+    counter = Counter()
+    total_tokens = 0
+    with open(args.output, 'a') as fout:
+        for outcome in imap_ordered(run_pending, pending, jobs=args.jobs):
+            result = outcome.result or {
+                'id': outcome.item[0]['id'],
+                'assistant_id': outcome.item[1],
+                'status': 'error',
+                'error': str(outcome.error),
+            }
+            fout.write(json.dumps(result, ensure_ascii=False) + '\n')
+            fout.flush()
+
+            counter[result['status']] += 1
+            total_tokens += (result.get('usage') or {}).get('total_tokens', 0)
+            print(f"{result['status']} {result['id']} ---> {result['assistant_id']}")
+
+    print(', '.join(f'{count} {status}' for status, count in counter.items()) or 'Nothing to run',
+          f'({len(finished)} skipped, {total_tokens} tokens)')
+    if cache:
+        stats = cache.stats()
+        print(f"Cache {stats['hits']} hits, {stats['misses']} misses")
+    return counter
+
+
+def add_discovery_arguments(parser):
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                        help='glob of prompt files, can be repeated (default: *.md)')
+    parser.add_argument('--exclude', action='append', metavar='GLOB',
+                        help='glob of files to skip, can be repeated')
+
+
 def setup_cli(assistant_subparsers):
     push_parser = assistant_subparsers.add_parser('push')
     push_parser.add_argument('path', nargs='?')
+    add_discovery_arguments(push_parser)
+    push_parser.add_argument('-j', '--jobs', type=int, default=1,
+                             help='number of prompts pushed concurrently')
+    push_parser.add_argument('-f', '--force', action='store_true',
+                             help='push prompts even if unchanged since the last push')
+    push_parser.add_argument('--diff', action='store_true',
+                             help='compare with remote assistants and send only changed fields')
+    push_parser.add_argument('--profiles', metavar='A,B,...',
+                             help=f'push to these profiles concurrently, {DEFAULT_PROFILE} for [gptman]')
     push_parser.set_defaults(func=push)
 
+    plan_parser = assistant_subparsers.add_parser('plan')
+    plan_parser.add_argument('path', nargs='?')
+    add_discovery_arguments(plan_parser)
+    plan_parser.set_defaults(func=plan)
+
     pull_parser = assistant_subparsers.add_parser('pull')
+    pull_parser.add_argument('-j', '--jobs', type=int, default=4,
+                             help='number of prompt files written concurrently')
+    add_discovery_arguments(pull_parser)
     pull_parser.set_defaults(func=pull)
 
+    watch_parser = assistant_subparsers.add_parser('watch')
+    watch_parser.add_argument('-j', '--jobs', type=int, default=4,
+                              help='number of prompts pushed concurrently')
+    watch_parser.add_argument('--debounce', type=float, default=0.3,
+                              help='seconds without changes before pushing')
+    add_discovery_arguments(watch_parser)
+    watch_parser.set_defaults(func=watch)
+
     shell_parser = assistant_subparsers.add_parser('shell')
+    shell_parser.add_argument('--cache', action='store_true',
+                              help='reuse cached responses of identical requests')
+    shell_parser.add_argument('--warm-threads', type=int, default=2,
+                              help='number of empty threads created ahead of time')
     shell_parser.set_defaults(func=shell)
     group = shell_parser.add_mutually_exclusive_group(required=False)
     group.add_argument('path', nargs='?', type=Path)
     group.add_argument('--id', nargs='*')
 
+    eval_parser = assistant_subparsers.add_parser('eval')
+    eval_parser.add_argument('dataset', help='JSONL or CSV file with id and input columns')
+    eval_parser.add_argument('-a', '--assistant', action='append', required=True,
+                             help='prompt file or assistant id, can be repeated')
+    eval_parser.add_argument('-o', '--output', required=True,
+                             help='JSONL file results are appended to, completed cases are skipped')
+    eval_parser.add_argument('-j', '--jobs', type=int, default=4,
+                             help='number of cases run concurrently')
+    eval_parser.add_argument('--cache', action='store_true',
+                             help='reuse cached responses of identical cases')
+    eval_parser.set_defaults(func=evaluate)
+
     list_parser = assistant_subparsers.add_parser('list')
     list_parser.add_argument('-l', '--long', action='store_true')
     list_parser.set_defaults(func=list_asst)
@@ -0,0 +1,54 @@
+import os
+import re
+import functools
+
+
+DEFAULT_INCLUDE = ['*.md']
+
+
+@functools.lru_cache(maxsize=None)
+def compile_glob(pattern):
+    '''`*` and `?` stop at slashes, `**` matches any number of directories.'''
+    regex = ''
+    for token in re.split(r'(\*\*/|\*\*|\*|\?)', pattern.lstrip('/')):
+        regex += {
+            '**/': '(?:.*/)?',
+            '**': '.*',
+            '*': '[^/]*',
+            '?': '[^/]',
+        }.get(token, re.escape(token))
+    return re.compile(regex + '$')
+
+
+def is_prompt_file(path, include=None, exclude=None):
+    '''Match the path relative to the root against include and exclude globs.
+
+    Patterns match the whole relative path, so `*.md` matches files in the
+    root only and `**/*.md` matches them in subdirectories too.
+    '''
+    path = path.replace(os.sep, '/')
+    if any(part.startswith('.') for part in path.split('/')[:-1]):
+        return False
+
+    def matches(pattern):
+        return compile_glob(pattern).match(path)
+
+    return any(matches(pattern) for pattern in include or DEFAULT_INCLUDE) \
+        and not any(matches(pattern) for pattern in exclude or [])
+
+
+def find_prompt_files(root='.', include=None, exclude=None):
+    '''Find prompt files under the root, skipping hidden directories.
+
+    Subdirectories are searched only if an include pattern has a slash.
+    Paths are relative to the root, sorted.
+    '''
+    recursive = any('/' in pattern.lstrip('/') for pattern in include or DEFAULT_INCLUDE)
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [dirname for dirname in dirnames if recursive and not dirname.startswith('.')]
+        for filename in filenames:
+            path = os.path.relpath(os.path.join(dirpath, filename), root)
+            if is_prompt_file(path, include, exclude):
+                paths.append(path)
+    return sorted(paths)
@@ -0,0 +1,104 @@
+import os
+import csv
+import json
+import time
+import logging
+
+import openai
+
+from gptman import exceptions as exc
+from gptman.assistant import get_run_content
+from gptman.assistant.polling import poll_run
+
+
+logger = logging.getLogger('gptman')
+
+
+def read_cases(path):
+    '''Yield evaluation cases from a JSONL or CSV file one at a time.
+
+    Each case has an `input` and an `id`, which defaults to its line number.
+    '''
+    with open(path, newline='') as fin:
+        if str(path).endswith('.csv'):
+            rows = csv.DictReader(fin)
+        else:
+            rows = (json.loads(line) for line in fin if line.strip())
+
+        for idx, row in enumerate(rows, 1):
+            yield {**row, 'id': str(row.get('id') or idx)}
+
+
+def read_finished(path):
+    '''Return (case id, assistant id) pairs already completed in the output.'''
+    finished = set()
+    if not os.path.exists(path):
+        return finished
+
+    with open(path) as fin:
+        for line in fin:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of an interrupted run may be incomplete
+                continue
+            if result.get('status') == 'completed':
+                finished.add((result['id'], result['assistant_id']))
+    return finished
+
+
+def run_case(client: openai.OpenAI, asst_id, case, policy=None, cache=None):
+    result = {
+        'id': case['id'],
+        'assistant_id': asst_id,
+        'input': case['input'],
+        'output': None,
+        'status': None,
+        'latency': None,
+        'usage': None,
+    }
+
+    started_at = time.monotonic()
+    run_obj = None
+
+    if cache:
+        cache_key = cache.make_key(client, asst_id, [('user', case['input'], [])])
+        cached = cache.get(cache_key)
+        if cached is not None:
+            result.update({
+                'output': cached,
+                'status': 'completed',
+                'latency': round(time.monotonic() - started_at, 3),
+                'cached': True,
+            })
+            return result
+
+    try:
+        run_obj = client.beta.threads.create_and_run(
+            assistant_id=asst_id,
+            thread={'messages': [{'role': 'user', 'content': case['input']}]},
+        )
+        run_obj = poll_run(client, run_obj, policy)
+        result['output'] = get_run_content(client, run_obj)
+        if cache:
+            cache.set(cache_key, result['output'])
+    except exc.RunFailed as ex:
+        run_obj = ex.run
+        result['error'] = str(ex)
+    except exc.RequestTimeout:
+        result['status'] = 'timeout'
+    except Exception as ex:
+        logger.debug('Case %s failed', case['id'], exc_info=True)
+        result['status'] = 'error'
+        result['error'] = str(ex)
+
+    result['latency'] = round(time.monotonic() - started_at, 3)
+    result['status'] = result['status'] or run_obj.status
+    usage = getattr(run_obj, 'usage', None)
+    if usage:
+        result['usage'] = {
+            'prompt_tokens': usage.prompt_tokens,
+            'completion_tokens': usage.completion_tokens,
+            'total_tokens': usage.total_tokens,
+        }
+    return result
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import logging
+import threading
+
+from collections import namedtuple
+
+import openai
+
+from gptman.main import get_cache_dir
+
+
+logger = logging.getLogger('gptman')
+
+FULL_SYNC_PAGE_SIZE = 10000
+INCREMENTAL_PAGE_SIZE = 100
+
+# A file in these statuses does not change anymore
+FINAL_STATUSES = ['processed', 'error']
+
+CachedFile = namedtuple('CachedFile', ['id', 'filename', 'purpose', 'bytes', 'created_at', 'status'])
+
+
+class FileCache:
+    '''Metadata of the organization's files stored in SQLite.
+
+    `sync` fetches only the files created since the last completed sync,
+    newest first, so listing stays fast with tens of thousands of files.
+    Until a sync completes, the next one fetches every file. Files deleted
+    elsewhere are noticed with a full refresh only.
+    '''
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_cache_dir(), 'files.sqlite')
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                ' id TEXT PRIMARY KEY, filename TEXT, purpose TEXT, bytes INTEGER,'
+                ' created_at INTEGER, status TEXT)'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS files_created_at ON files (created_at)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)')
+
+    def sync(self, client: openai.OpenAI, refresh=False):
+        '''Fetch files created since the last sync and return how many were added.'''
+        with self.lock, self.conn:
+            if refresh:
+                self.conn.execute('DELETE FROM files')
+                self.conn.execute("DELETE FROM meta WHERE key = 'synced_until'")
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'synced_until'").fetchone()
+        synced_until = row[0] if row else None
+
+        count = 0
+        newest = synced_until
+        # An incremental sync usually stops within the first page
+        limit = FULL_SYNC_PAGE_SIZE if synced_until is None else INCREMENTAL_PAGE_SIZE
+        for file_obj in client.files.list(order='desc', limit=limit):
+            # Files created in the same second as the last synced one may be new
+            if synced_until is not None and file_obj.created_at < synced_until:
+                break
+            self.put(file_obj)
+            newest = max(newest or file_obj.created_at, file_obj.created_at)
+            count += 1
+
+        if newest is not None:
+            with self.lock, self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('synced_until', ?)", (newest,))
+        return count
+
+    def put(self, file_obj):
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)',
+                (file_obj.id, file_obj.filename, file_obj.purpose, file_obj.bytes,
+                 file_obj.created_at, file_obj.status),
+            )
+
+    def remove(self, file_id):
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM files WHERE id = ?', (file_id,))
+
+    def get(self, file_id):
+        with self.lock:
+            row = self.conn.execute('SELECT * FROM files WHERE id = ?', (file_id,)).fetchone()
+        return CachedFile(*row) if row else None
+
+    def search(self, name=None, purpose=None):
+        query = 'SELECT * FROM files WHERE 1 = 1'
+        params = []
+        if name:
+            query += " AND filename LIKE ? ESCAPE '\\'"
+            escaped = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f'%{escaped}%')
+        if purpose:
+            query += ' AND purpose = ?'
+            params.append(purpose)
+        query += ' ORDER BY created_at DESC'
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [CachedFile(*row) for row in rows]
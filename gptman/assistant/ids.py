@@ -0,0 +1,46 @@
+import os
+import json
+import threading
+
+from gptman.fileutils import atomic_write, read_json_state
+from gptman.assistant.manifest import STATE_DIR
+
+
+IDS_PATH = os.path.join(STATE_DIR, 'ids.json')
+
+# The [gptman] section, whose assistant ids are kept in the preamble
+DEFAULT_PROFILE = 'default'
+
+
+def manifest_key(asst_id, profile=None):
+    '''Key of the assistant in the manifest, qualified by the profile unless it is the default.
+
+    Assistants in different accounts or Azure resources may share an id.
+    '''
+    return asst_id if profile in (None, DEFAULT_PROFILE) else f'{profile}:{asst_id}'
+
+
+class AssistantIds:
+    '''Assistant ids of prompt files in profiles other than the default.
+
+    The preamble holds a single id, so ids in the other profiles are kept
+    in .gptman/ids.json by prompt file path and profile.
+    '''
+
+    def __init__(self, path=IDS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = read_json_state(path, {})
+
+    def get(self, path, profile):
+        with self.lock:
+            return self.entries.get(str(path), {}).get(profile)
+
+    def set(self, path, profile, asst_id):
+        with self.lock:
+            self.entries.setdefault(str(path), {})[profile] = asst_id
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self.lock:
+            atomic_write(self.path, json.dumps(self.entries, indent=2, sort_keys=True) + '\n')
@@ -0,0 +1,146 @@
+import os
+import re
+import json
+import threading
+
+from gptman import exceptions as exc
+from gptman.fileutils import atomic_write, read_json_state
+from gptman.assistant.manifest import STATE_DIR
+from gptman.assistant.prompt import read_prompt_file
+
+
+BUILD_PATH = os.path.join(STATE_DIR, 'build.json')
+
+# A line like <!-- include: shared/policy.md -->
+INCLUDE_PATTERN = re.compile(r'^<!--\s*include:\s*(\S.*?)\s*-->[ \t]*$', re.MULTILINE)
+
+
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def resolve_includes(path, text, stack=()):
+    '''Replace include directives in the text of the file at path.
+
+    Included paths are relative to the including file and may include
+    other files. Returns the resolved text and the stamps of every file
+    included directly or transitively, taken before the file was read.
+    '''
+    stamps = {}
+
+    def replace(match):
+        target = os.path.normpath(os.path.join(os.path.dirname(path), match.group(1)))
+        if target == path or target in stack:
+            raise exc.IncludeError(f'{path}: include cycle through {target}')
+
+        stamps[target] = file_stamp(target)
+        try:
+            with open(target) as fin:
+                content = fin.read()
+        except FileNotFoundError:
+            raise exc.IncludeError(f'{path}: included file {target} not found')
+
+        resolved, nested_stamps = resolve_includes(target, content, stack + (path,))
+        stamps.update(nested_stamps)
+        return resolved.rstrip('\n')
+
+    return INCLUDE_PATTERN.sub(replace, text), stamps
+
+
+def has_includes(path):
+    with open(path) as fin:
+        return bool(INCLUDE_PATTERN.search(fin.read()))
+
+
+def read_resolved_prompt_file(path):
+    '''Read a prompt file with its includes resolved, and the stamps of the files read.'''
+    path = os.path.normpath(str(path))
+    stamps = {path: file_stamp(path)}
+    data = read_prompt_file(path)
+    if data.get('instructions'):
+        data['instructions'], include_stamps = resolve_includes(path, data['instructions'])
+        stamps.update(include_stamps)
+    return data, stamps
+
+
+class PromptBuild:
+    '''Prompt files with includes resolved, cached in .gptman/build.json.
+
+    A cached prompt is valid while the prompt file and every file it
+    includes keep their mtime and size, so only prompts affected by a
+    change are read and resolved again.
+    '''
+
+    def __init__(self, path=BUILD_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.entries = read_json_state(path, {})
+
+    def read(self, path):
+        path = os.path.normpath(str(path))
+        with self.lock:
+            entry = self.entries.get(path)
+
+        if entry and all(file_stamp(dep) == stamp for dep, stamp in entry['stamps'].items()):
+            return dict(entry['data'])
+
+        data, stamps = read_resolved_prompt_file(path)
+        with self.lock:
+            self.entries[path] = {'stamps': stamps, 'data': data}
+            self.dirty = True
+        return dict(data)
+
+    def find_prompts(self, paths):
+        '''Return the paths which are not included by any of the prompts.
+
+        Files which cannot be read as prompts are kept, so pushing them
+        reports the error.
+        '''
+        for path in paths:
+            try:
+                self.read(path)
+            except (exc.PreambleNotFound, exc.IncludeError, OSError):
+                continue
+
+        fragments = self.fragments(paths)
+        return [path for path in paths if os.path.normpath(str(path)) not in fragments]
+
+    def fragments(self, paths=None):
+        '''Return the files included by the given prompts, or by any cached prompt.'''
+        prompts = None if paths is None else {os.path.normpath(str(path)) for path in paths}
+        with self.lock:
+            return {
+                dep
+                for path, entry in self.entries.items()
+                if prompts is None or path in prompts
+                for dep in entry['stamps']
+                if dep != path
+            }
+
+    def dependents(self, changed_paths):
+        '''Return the cached prompts which are or include any of the changed paths.'''
+        changed = {os.path.normpath(str(path)) for path in changed_paths}
+        with self.lock:
+            return sorted(
+                path
+                for path, entry in self.entries.items()
+                if changed & set(entry['stamps'])
+            )
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            self.entries = {
+                path: entry
+                for path, entry in self.entries.items()
+                if os.path.exists(path)
+            }
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            atomic_write(self.path, json.dumps(self.entries, indent=2, sort_keys=True) + '\n')
+            self.dirty = False
@@ -0,0 +1,65 @@
+import os
+import json
+
+from gptman.exceptions import PreambleNotFound
+from gptman.fileutils import atomic_write, read_json_state
+from gptman.assistant.manifest import STATE_DIR
+from gptman.assistant.prompt import read_preamble
+
+
+INDEX_PATH = os.path.join(STATE_DIR, 'index.json')
+
+
+class PromptIndex:
+    '''Assistant ids of prompt files, cached by file mtime and size.
+
+    Only the preamble of a new or modified file is read, the rest of the
+    lookups are answered with a single stat call.
+    '''
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.dirty = False
+        self.entries = read_json_state(path, {})
+
+    def lookup(self, filename):
+        filename = str(filename)
+        stat = os.stat(filename)
+        entry = self.entries.get(filename)
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry['id']
+
+        try:
+            asst_id = read_preamble(filename).get('id')
+        except PreambleNotFound:
+            asst_id = None
+
+        self.entries[filename] = {
+            'id': asst_id,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+        }
+        self.dirty = True
+        return asst_id
+
+    def id_to_filename(self, filenames):
+        return {
+            asst_id: filename
+            for filename in filenames
+            if (asst_id := self.lookup(filename))
+        }
+
+    def save(self, filenames=None):
+        if filenames is not None:
+            kept = {str(filename) for filename in filenames}
+            removed = set(self.entries) - kept
+            for filename in removed:
+                del self.entries[filename]
+            self.dirty = self.dirty or bool(removed)
+
+        if not self.dirty:
+            return
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        atomic_write(self.path, json.dumps(self.entries, indent=2, sort_keys=True) + '\n')
+        self.dirty = False
@@ -0,0 +1,47 @@
+import os
+import json
+import hashlib
+
+from gptman.fileutils import atomic_write, read_json_state
+
+
+STATE_DIR = '.gptman'
+MANIFEST_PATH = os.path.join(STATE_DIR, 'state.json')
+
+
+def prompt_digest(data: dict):
+    '''Hash of the prompt content as it is sent to the API.
+
+    The assistant id is left out and values are stripped, so rewriting the
+    preamble with a new id or trailing newlines does not change the digest.
+    '''
+    normalized = {
+        k: (v or '').strip() if isinstance(v, str) or v is None else v
+        for k, v in data.items()
+        if k != 'id'
+    }
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def read_manifest(path=MANIFEST_PATH):
+    manifest = read_json_state(path, {})
+    manifest.setdefault('assistants', {})
+    return manifest
+
+
+def write_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write(path, json.dumps(manifest, indent=2, sort_keys=True) + '\n')
+
+
+def is_unchanged(manifest, asst_id, digest):
+    entry = manifest['assistants'].get(asst_id)
+    return bool(entry) and entry.get('digest') == digest
+
+
+def record_push(manifest, asst_id, digest, path):
+    manifest['assistants'][asst_id] = {
+        'digest': digest,
+        'path': str(path),
+    }
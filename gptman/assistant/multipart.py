@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+import hashlib
+import logging
+import mimetypes
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import openai
+
+from gptman.main import get_cache_dir
+from gptman.fileutils import atomic_write
+from gptman.workers import imap_ordered
+
+
+logger = logging.getLogger('gptman')
+
+PART_SIZE = 64 * 1024 * 1024
+MULTIPART_THRESHOLD = PART_SIZE
+
+
+def journal_path(path, purpose, journal_dir=None):
+    '''Journal of an upload, named after the file path, size, mtime and purpose.
+
+    A modified file gets another journal, so stale parts are never reused.
+    '''
+    stat = os.stat(path)
+    key = f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{purpose}'
+    name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return os.path.join(journal_dir or os.path.join(get_cache_dir(), 'multipart'), f'{name}.json')
+
+
+def read_journal(path, part_size):
+    try:
+        with open(path) as fin:
+            journal = json.load(fin)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    # Leave a minute to upload the rest of the parts
+    if journal['expires_at'] < time.time() + 60 or journal['part_size'] != part_size:
+        return None
+    return journal
+
+
+def write_journal(path, journal):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write(path, json.dumps(journal, indent=2))
+
+
+def print_progress(path, done, total):
+    percent = done * 100 // total if total else 100
+    end = '\n' if done >= total else ''
+    print(f'\rUploading {os.path.basename(path)}: {percent}%', end=end, flush=True)
+
+
+def upload_large_file(client: openai.OpenAI, path, purpose='assistants', part_size=PART_SIZE, jobs=4,
+                      journal_dir=None, on_progress=print_progress):
+    '''Upload a file in parts through the Uploads API.
+
+    Parts are sent concurrently and recorded in a local journal as they
+    complete, so an interrupted upload continues from the remaining parts
+    when it is started again. Returns the uploaded file object.
+    '''
+    size = os.path.getsize(path)
+    num_parts = max((size + part_size - 1) // part_size, 1)
+    journal_file = journal_path(path, purpose, journal_dir)
+    journal = read_journal(journal_file, part_size)
+
+    if journal:
+        logger.info('Resume upload %s of %s', journal['upload_id'], path)
+    else:
+        upload = client.uploads.create(
+            bytes=size,
+            filename=os.path.basename(path),
+            mime_type=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            purpose=purpose,
+        )
+        journal = {
+            'upload_id': upload.id,
+            'expires_at': upload.expires_at,
+            'part_size': part_size,
+            'parts': {},
+        }
+        write_journal(journal_file, journal)
+
+    def upload_part(idx):
+        with open(path, 'rb') as fin:
+            fin.seek(idx * part_size)
+            data = fin.read(part_size)
+        return client.uploads.parts.create(journal['upload_id'], data=data).id
+
+    def uploaded_bytes():
+        return min(len(journal['parts']) * part_size, size)
+
+    missing = [idx for idx in range(num_parts) if str(idx) not in journal['parts']]
+    on_progress(path, uploaded_bytes(), size)
+
+    errors = []
+    for outcome in imap_ordered(upload_part, missing, jobs=jobs):
+        if outcome.error:
+            errors.append(outcome.error)
+            continue
+
+        journal['parts'][str(outcome.item)] = outcome.result
+        write_journal(journal_file, journal)
+        on_progress(path, uploaded_bytes(), size)
+
+    if errors:
+        raise errors[0]
+
+    upload = client.uploads.complete(
+        journal['upload_id'],
+        part_ids=[journal['parts'][str(idx)] for idx in range(num_parts)],
+    )
+    os.unlink(journal_file)
+    logger.debug(upload)
+    return upload.file
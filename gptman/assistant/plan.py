@@ -0,0 +1,54 @@
+import difflib
+
+
+def index_assistants(assistants):
+    return {asst.id: asst for asst in assistants}
+
+
+def remote_value(asst, field):
+    if field == 'tools':
+        return ' '.join(tool.type for tool in asst.tools or [])
+    return getattr(asst, field, None)
+
+
+def normalize_value(field, value):
+    if value is None:
+        return ''
+    if field == 'tools':
+        return sorted(set(str(value).split()))
+    return str(value).strip()
+
+
+def diff_prompt(data: dict, asst):
+    '''Compare local prompt data with a remote assistant.
+
+    Returns a dict mapping each differing field to a (remote, local) pair.
+    '''
+    changes = {}
+    for field, local in data.items():
+        if field == 'id':
+            continue
+
+        remote = remote_value(asst, field)
+        if normalize_value(field, remote) != normalize_value(field, local):
+            changes[field] = (remote, local)
+
+    return changes
+
+
+def format_changes(changes: dict):
+    lines = []
+    for field, (remote, local) in changes.items():
+        if field == 'instructions':
+            lines.append(f'  {field}:')
+            lines += [
+                f'    {line}'
+                for line in difflib.unified_diff(
+                    (remote or '').strip().splitlines(),
+                    (local or '').strip().splitlines(),
+                    'remote', 'local', lineterm='',
+                )
+            ]
+        else:
+            lines.append(f'  {field}: {remote!r} -> {local!r}')
+    return '\n'.join(lines)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import time
+import random
+import logging
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import openai
+
+from gptman import exceptions as exc
+from gptman.instrument import record_run
+
+
+logger = logging.getLogger('gptman')
+
+FAILED_STATUSES = ['failed', 'cancelled', 'expired', 'incomplete', 'requires_action']
+TERMINAL_STATUSES = ['completed'] + FAILED_STATUSES
+
+
+class PollingPolicy:
+    '''How often and how long a run is polled.
+
+    Intervals start at `initial_interval` and grow by `multiplier` up to
+    `max_interval`, each randomized by +/- `jitter` (a ratio).
+    The policy can be set per profile in gptman.toml:
+
+        [gptman.polling]
+        initial_interval = 0.2
+        max_interval = 5
+        timeout = 120
+    '''
+
+    def __init__(self, initial_interval=0.2, max_interval=5.0, multiplier=2.0, jitter=0.2, timeout=60):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.timeout = timeout
+
+    @classmethod
+    def from_settings(cls, profile_settings):
+        return cls(**(profile_settings or {}).get('polling', {}))
+
+    def intervals(self):
+        interval = self.initial_interval
+        while True:
+            yield interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            interval = min(interval * self.multiplier, self.max_interval)
+
+
+def poll_run(client: openai.OpenAI, run_obj, policy=None, on_poll=None, sleep=time.sleep):
+    '''Poll the run until it reaches a terminal status.
+
+    Raises RunFailed unless the run is completed. The run is cancelled on
+    the server when it times out or the polling is interrupted.
+    '''
+    policy = policy or PollingPolicy()
+    deadline = time.monotonic() + policy.timeout
+    intervals = policy.intervals()
+
+    try:
+        while run_obj.status not in TERMINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                cancel_run(client, run_obj)
+                raise exc.RequestTimeout(run_obj)
+
+            sleep(min(next(intervals), remaining))
+            if on_poll:
+                on_poll(run_obj)
+            run_obj = client.beta.threads.runs.retrieve(run_obj.id, thread_id=run_obj.thread_id)
+            logger.debug(run_obj)
+    except KeyboardInterrupt:
+        cancel_run(client, run_obj)
+        raise
+
+    record_run(run_obj)
+
+    if run_obj.status == 'requires_action':
+        # Function calling is not supported, so the run cannot proceed
+        cancel_run(client, run_obj)
+
+    if run_obj.status in FAILED_STATUSES:
+        raise exc.RunFailed(run_obj)
+
+    return run_obj
+
+
+def cancel_run(client: openai.OpenAI, run_obj):
+    import openai
+
+    try:
+        client.beta.threads.runs.cancel(run_obj.id, thread_id=run_obj.thread_id)
+        logger.info('Cancelled run %s', run_obj.id)
+    except openai.OpenAIError as ex:
+        logger.warning('Failed to cancel run %s: %s', run_obj.id, ex)
@@ -1,4 +1,5 @@
 from gptman.exceptions import PreambleNotFound
+from gptman.fileutils import atomic_write, write_if_changed
 
 
 def read_prompt_file(path):
@@ -7,17 +8,64 @@ def read_prompt_file(path):
         return parse_markdown_with_preamble(body)
 
 
+def read_preamble(path):
+    '''Read only the preamble of a prompt file.
+
+    The file is read line by line and closed at the closing `---`, so large
+    instructions are never loaded.
+    '''
+    with open(path) as fin:
+        if not fin.readline().startswith('---'):
+            raise PreambleNotFound()
+
+        data = {}
+        for line in fin:
+            line = line.rstrip('\n')
+            if line.startswith('---'):
+                return data
+
+            entry = parse_preamble_data(line)
+            if entry:
+                k, v = entry
+                data[k] = v
+
+    raise PreambleNotFound()
+
+
 def write_prompt_file(path, data: dict):
+    atomic_write(path, render_prompt_file(data))
+
+
+def sync_prompt_file(path, data: dict):
+    '''Write data over the prompt file, unless it already holds the same data.
+
+    Keys of the existing preamble keep their order, and keys which are not
+    in data, like `tools`, are kept.
+    '''
+    try:
+        existing = read_prompt_file(path)
+    except (FileNotFoundError, PreambleNotFound):
+        return write_if_changed(path, render_prompt_file(data))
+
+    merged = {**existing, **data}
+    if render_prompt_file(merged) == render_prompt_file(existing):
+        return 'unchanged'
+    return write_if_changed(path, render_prompt_file(merged))
+
+
+def render_prompt_file(data: dict):
     temp_data = {**data}
     instructions = temp_data.pop('instructions')
-    with open(path, 'w') as fout:
-        fout.write('---\n')
-        for k, v in temp_data.items():
-            fout.write(f'{k}: {v}\n')
-        if temp_data:
-            fout.write('---\n')
-        fout.write(instructions or '')
-        fout.write('\n')
+    lines = ['---\n']
+    for k, v in temp_data.items():
+        lines.append(f'{k}: {v}\n')
+    if temp_data:
+        lines.append('---\n')
+    instructions = instructions or ''
+    lines.append(instructions)
+    if not instructions.endswith('\n'):
+        lines.append('\n')
+    return ''.join(lines)
 
 
 def parse_markdown_with_preamble(text):
@@ -1,3 +1,6 @@
+import time
+import shutil
+import threading
 import datetime
 import logging
 
@@ -5,39 +8,44 @@ import openai
 
 from pathlib import Path
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 
 from openai.resources.beta.threads.threads import Thread
+from tabulate import tabulate
 
+from gptman import exceptions as exc
 from gptman.contextmanagers import with_history
 from gptman.prefixcmd import PrefixCmd
 from gptman.assistant import (
     run_assistant,
-    attach_file,
+    stream_assistant,
+    get_run_content,
     send_message,
-    list_files,
     delete_file,
 )
+from gptman.assistant.polling import PollingPolicy, poll_run
+from gptman.assistant.cache import ResponseCache
+from gptman.assistant.warmup import WarmThreadPool
+from gptman.assistant.filecache import FINAL_STATUSES, FileCache
+from gptman.assistant.uploads import SUPPORTED_FILES, expand_paths, upload_files
+from gptman.workers import Outcome, imap_ordered
 
 logger = logging.getLogger('gptman')
 
 
-def run_shell(client: openai.OpenAI, asst_id: str):
+def run_shell(client: openai.OpenAI, asst_id: str, policy: Optional[PollingPolicy] = None,
+              cache: Optional[ResponseCache] = None, warm_threads=2):
     with with_history():
+        shell = AssistantShell(client, asst_id, policy=policy, cache=cache, warm_threads=warm_threads)
         try:
-            shell = AssistantShell(client, asst_id)
             shell.cmdloop()
         except KeyboardInterrupt:
             return
+        finally:
+            shell.close()
 
 
-SUPPORTED_FILES = [
-    '.c', '.cpp', '.cs', '.css',
-    '.doc', '.docx', '.html',
-    '.java', '.js', '.json',
-    '.md',
-    '.pdf', '.php', '.pptx', '.py',
-    '.rb', '.sh', '.tex', '.ts', '.txt'
-]
+MODES = ['chain', 'broadcast']
 
 
 class AssistantShell(PrefixCmd):
@@ -47,33 +55,70 @@ class AssistantShell(PrefixCmd):
     assistant_id: Optional[str]
     thread: Optional[Thread]
 
-    def __init__(self, client: openai.OpenAI, assistant_id: Optional[str], **kwargs):
+    def __init__(self, client: openai.OpenAI, assistant_id: Optional[str],
+                 policy: Optional[PollingPolicy] = None, cache: Optional[ResponseCache] = None,
+                 warm_threads=0, **kwargs):
         self.client = client
+        self.thread_pool = WarmThreadPool(client, warm_threads) if warm_threads else None
+        self._file_cache = None
         self.assistant_id = assistant_id
+        self.policy = policy
+        self.cache = cache
         self.renew_pipeline = False
         self.debug_mode = False
+        self.stream_mode = True
+        self.mode = 'chain'
+        self.broadcast_threads = {}
         self.new_thread()
         self.log_path = None
 
         super().__init__(**kwargs)
 
     def new_thread(self):
-        self.thread = self.client.beta.threads.create()
+        self.thread = self.create_thread()
+
+    def create_thread(self):
+        if self.thread_pool:
+            return self.thread_pool.acquire()
+        return self.client.beta.threads.create()
+
+    def close(self):
+        if self.thread_pool:
+            self.thread_pool.close()
+
+    def get_assistant_ids(self):
+        return self.assistant_id if isinstance(self.assistant_id, (list, tuple)) else [self.assistant_id]
 
     def default(self, line):
-        asst_ids = self.assistant_id if isinstance(self.assistant_id, (list, tuple)) else [self.assistant_id]
+        if self.mode == 'broadcast':
+            self.broadcast(line)
+            return
+
+        asst_ids = self.get_assistant_ids()
 
-        for asst_id in asst_ids:
-            if self.do_set_renew:
+        for idx, asst_id in enumerate(asst_ids):
+            if self.renew_pipeline:
                 self.new_thread()
-            self.client.beta.threads.messages.create(
-                thread_id=self.thread.id,
-                role='user',
-                content=line,
-            )
+            messages = [{'role': 'user', 'content': line}]
 
             print(f'Querying thread to assistant {asst_id}...')
-            line = run_assistant(self.client, asst_id, self.thread)
+            # Only the last assistant of a chain answers the user
+            streaming = self.stream_mode and idx == len(asst_ids) - 1
+            try:
+                if streaming:
+                    line = stream_assistant(self.client, asst_id, self.thread, cache=self.cache,
+                                            additional_messages=messages)
+                    print()
+                else:
+                    line = run_assistant(self.client, asst_id, self.thread, policy=self.policy, cache=self.cache,
+                                         additional_messages=messages)
+            except KeyboardInterrupt:
+                print('\nRun is cancelled.')
+                return
+            except (exc.RunFailed, exc.RequestTimeout) as ex:
+                print(f'\n{ex}')
+                return
+
             if self.debug_mode:
                 print('--- START DEBUG MESSAGE ---')
                 print(line)
@@ -82,12 +127,109 @@ class AssistantShell(PrefixCmd):
         if self.log_path:
             with open(self.log_path, 'a') as fout:
                 fout.write(line)
-        print(line)
+        if not streaming:
+            print(line)
+
+    def broadcast(self, line):
+        asst_ids = self.get_assistant_ids()
+        print(f'Querying {len(asst_ids)} assistants...')
+        interrupted = threading.Event()
+
+        def sleep(seconds):
+            if interrupted.wait(seconds):
+                # Stop polling, so the run is cancelled on the server
+                raise KeyboardInterrupt()
+
+        def query(asst_id):
+            started_at = time.monotonic()
+            # Each assistant keeps a thread of its own across messages
+            if asst_id not in self.broadcast_threads:
+                self.broadcast_threads[asst_id] = self.create_thread()
+            run_obj = self.client.beta.threads.runs.create(
+                thread_id=self.broadcast_threads[asst_id].id,
+                assistant_id=asst_id,
+                additional_messages=[{'role': 'user', 'content': line}],
+            )
+            run_obj = poll_run(self.client, run_obj, self.policy, sleep=sleep)
+            content = get_run_content(self.client, run_obj)
+            return content, time.monotonic() - started_at
+
+        started_at = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=len(asst_ids))
+        futures = [executor.submit(query, asst_id) for asst_id in asst_ids]
+        outcomes = []
+        try:
+            for asst_id, future in zip(asst_ids, futures):
+                try:
+                    outcomes.append(Outcome(asst_id, future.result(), None))
+                except Exception as ex:
+                    outcomes.append(Outcome(asst_id, None, ex))
+        except KeyboardInterrupt:
+            interrupted.set()
+            print('\nRuns are cancelled.')
+            return
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # A thread may still be busy with its cancelled run
+            for asst_id, future in zip(asst_ids, futures):
+                if future.cancelled() or future.exception():
+                    self.broadcast_threads.pop(asst_id, None)
+        elapsed = time.monotonic() - started_at
+
+        headers = []
+        row = []
+        for outcome in outcomes:
+            if outcome.error:
+                headers.append(f'{outcome.item} (failed)')
+                row.append(str(outcome.error))
+            else:
+                content, latency = outcome.result
+                headers.append(f'{outcome.item} ({latency:.1f}s)')
+                row.append(content)
+
+        if self.log_path:
+            with open(self.log_path, 'a') as fout:
+                for header, content in zip(headers, row):
+                    fout.write(f'--- {header}\n{content}\n')
+
+        width = shutil.get_terminal_size().columns
+        max_width = max(width // len(row) - 3, 10)
+        print(tabulate([row], headers=headers, tablefmt='grid', maxcolwidths=max_width))
+        print(f'Elapsed {elapsed:.1f}s')
+
+    def do_mode(self, arg):
+        '''Set how a message is sent to the assistant ID list.
+/mode chain: send to each assistant in turn, passing the answer to the next
+/mode broadcast: send the same message to all assistants concurrently'''
+        if arg not in MODES:
+            print(f'Mode should be one of {", ".join(MODES)}. Current mode is {self.mode}')
+            return
+        self.mode = arg
+
+    def do_cache(self, arg):
+        '''Use cached responses for identical requests.
+/cache on|off: whether use the response cache
+/cache stats: print cache hits and misses
+/cache clear: remove all cached responses'''
+        if arg in ['on', 'true', 'True', 'yes', 'y', 't']:
+            self.cache = self.cache or ResponseCache()
+        elif arg in ['off', 'false', 'False', 'no', 'n', 'f']:
+            self.cache = None
+        elif arg == 'stats' and self.cache:
+            print(', '.join(f'{k}: {v}' for k, v in self.cache.stats().items()))
+        elif arg == 'clear' and self.cache:
+            self.cache.clear()
+        else:
+            print(f'Response cache is {"on" if self.cache else "off"}')
 
     def do_debug(self, arg):
         'Print debug message'
         self.debug_mode = arg in ['true', 'True', 'yes', 'y', 't']
 
+    def do_stream(self, arg):
+        'Whether print the response while it is generated'
+        self.stream_mode = arg in ['true', 'True', 'yes', 'y', 't']
+
     def do_renew(self, arg):
         'Whether renew or keep during pipeline'
         self.renew_pipeline = arg in ['true', 'True', 'yes', 'y', 't']
@@ -97,7 +239,7 @@ class AssistantShell(PrefixCmd):
         self.log_path = arg
 
     def do_assistant(self, arg):
-        'Set assistant ID. It can be ID list to use prompt chaining.'
+        'Set assistant ID. It can be ID list to use prompt chaining or broadcasting.'
         if arg:
             self.assistant_id = [s.strip() for s in arg.split()]
 
@@ -115,89 +257,144 @@ class AssistantShell(PrefixCmd):
         return 1
 
     def do_image(self, arg):
-        '''Upload an image file.\n/image <filepath>'''
-        if not arg:
-            print('Filename should be provided')
+        '''Upload image files.\n/image <filepath or glob> [<filepath or glob> ...]'''
+        file_ids = self.upload(arg, ['.png'], purpose='vision')
+        if not file_ids:
             return
 
-        path = Path(arg)
+        # OpenAI playground assistant UI do this
+        content = [
+            {'type': 'image_file', 'image_file': {'file_id': file_id}}
+            for file_id in file_ids
+        ]
+        result = send_message(self.client, self.assistant_id, self.thread, content,
+                              stream=self.stream_mode, policy=self.policy)
+        if self.stream_mode:
+            print()
+        print('File is attached to the thread.')
+        if not self.stream_mode:
+            print(result)
 
-        if not path.exists():
-            print(f'File {arg} is not exists')
+    def upload(self, arg, suffixes, purpose='assistants'):
+        '''Upload the files matching arg concurrently and return their ids.'''
+        if not arg:
+            print('Filename should be provided')
             return
 
-        if path.suffix not in ['.png']:
-            print(f'{path.suffix} file is not supported')
-            return
+        paths = []
+        for path in map(Path, expand_paths(arg)):
+            if not path.exists():
+                print(f'File {path} is not exists')
+            elif path.suffix not in suffixes:
+                print(f'{path.suffix} file is not supported')
+            else:
+                paths.append(path)
 
-        message_file = attach_file(self.client, arg, purpose='vision')
-        print(f'Image is uploaded: {message_file}')
+        file_ids = []
+        for outcome in upload_files(self.client, paths, purpose=purpose):
+            if outcome.error:
+                print(f'Failed to upload {outcome.item}: {outcome.error}')
+                continue
 
-        # OpenAI playground assistant UI do this
-        content = [
-            {'type': 'image_file', 'image_file': {'file_id': message_file.id}}
-        ]
-        result = send_message(self.client, self.assistant_id, self.thread, content)
-        print('File is attached to the thread.')
-        print(result)
+            file_id, reused = outcome.result
+            print(f"File is {'reused' if reused else 'uploaded'}: {outcome.item} ({file_id})")
+            file_ids.append(file_id)
 
-    def do_file(self, arg):
-        '''Upload a file.\n/file <filepath>'''
+        return file_ids
 
-        if arg.strip() == 'list':
-            self.sub_do_file_list()
+    def do_file(self, arg):
+        '''Upload files.\n/file <filepath or glob> [<filepath or glob> ...]
+/file list [--refresh] [--purpose <purpose>] [<name>]: list files from the local cache
+/file status [--refresh] <file_id> [<file_id> ...]: print file details
+/file delete <file_id> [<file_id> ...]: delete files'''
+        args = arg.split()
+
+        if args[:1] == ['list']:
+            self.sub_do_file_list(args[1:])
             return
 
-        if arg.startswith('delete'):
-            file_id = arg.split(' ', 1)
-            self.sub_do_file_delete(file_id)
+        if args[:1] == ['delete']:
+            self.sub_do_file_delete(args[1:])
             return
 
-        if arg.startswith('status'):
-            file_id = arg.split(' ', 1)
-            self.sub_do_file_status(file_id)
+        if args[:1] == ['status']:
+            self.sub_do_file_status(args[1:])
             return
 
         self.sub_do_file_upload(arg)
 
-    def sub_do_file_list(self):
-        for file_obj in list_files(self.client):
+    @property
+    def file_cache(self):
+        if self._file_cache is None:
+            self._file_cache = FileCache()
+        return self._file_cache
+
+    def sub_do_file_list(self, args):
+        refresh = '--refresh' in args
+        args = [a for a in args if a != '--refresh']
+
+        purpose = None
+        if '--purpose' in args:
+            idx = args.index('--purpose')
+            purpose = args[idx + 1] if idx + 1 < len(args) else None
+            args = args[:idx] + args[idx + 2:]
+        name = ' '.join(args) or None
+
+        self.file_cache.sync(self.client, refresh=refresh)
+        for file_obj in self.file_cache.search(name=name, purpose=purpose):
             created_at = datetime.datetime.fromtimestamp(file_obj.created_at)
             print(f'{file_obj.filename} [{file_obj.id}, {created_at}]')
 
-    def sub_do_file_delete(self, file_id):
-        print(delete_file(self.client, file_id))
+    def sub_do_file_delete(self, file_ids):
+        for file_id in file_ids:
+            print(delete_file(self.client, file_id))
+            self.file_cache.remove(file_id)
 
     def sub_do_file_upload(self, arg):
-        if not arg:
-            print('Filename should be provided')
+        file_ids = self.upload(arg, SUPPORTED_FILES)
+        if not file_ids:
             return
 
-        path = Path(arg)
-
-        if not path.exists():
-            print(f'File {arg} is not exists')
-            return
-
-        if path.suffix not in SUPPORTED_FILES:
-            print(f'{path.suffix} file is not supported')
-            return
-
-        message_file = attach_file(self.client, arg)
-        print(f'File is uploaded: {message_file.filename} ({message_file.id})')
-
         # TODO: link file and thread/message
 
-        content = 'Here is a file you can refer.'
+        content = 'Here are files you can refer.' if len(file_ids) > 1 \
+            else 'Here is a file you can refer.'
         kwargs = {}
         kwargs['attachments'] = [
-            {'file_id': message_file.id, 'tools': [{'type': 'file_search'}]},
+            {'file_id': file_id, 'tools': [{'type': 'file_search'}]}
+            for file_id in file_ids
         ]
 
-        message = send_message(self.client, self.assistant_id, self.thread, content, **kwargs)
+        message = send_message(self.client, self.assistant_id, self.thread, content,
+                               stream=self.stream_mode, policy=self.policy, **kwargs)
         logger.debug(message)
+        if self.stream_mode:
+            print()
         print('File is attached to the thread.')
 
-    def sub_do_file_status(self, file_id):
-        file_info = self.client.files.retrieve(file_id)
-        print(file_info)
+    def sub_do_file_status(self, args):
+        refresh = '--refresh' in args
+        file_ids = [a for a in args if a != '--refresh']
+
+        # Files still being processed are retrieved again
+        cached = {} if refresh else {
+            file_id: file_obj
+            for file_id in file_ids
+            if (file_obj := self.file_cache.get(file_id)) and file_obj.status in FINAL_STATUSES
+        }
+
+        def retrieve(file_id):
+            file_obj = self.client.files.retrieve(file_id)
+            self.file_cache.put(file_obj)
+            return file_obj
+
+        missing = [file_id for file_id in file_ids if file_id not in cached]
+        for outcome in imap_ordered(retrieve, missing, jobs=4):
+            cached[outcome.item] = outcome.error or outcome.result
+
+        for file_id in file_ids:
+            file_obj = cached[file_id]
+            if isinstance(file_obj, Exception):
+                print(f'error {file_id}: {file_obj}')
+            else:
+                print(f'{file_obj.filename} [{file_obj.id}, {file_obj.status}]')
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import os
+import glob
+import json
+import shlex
+import hashlib
+import threading
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import openai
+
+from gptman.main import get_cache_dir
+from gptman.fileutils import atomic_write, read_json_state
+from gptman.workers import Outcome, imap_ordered
+from gptman.assistant import attach_file, retrieve_file
+
+
+SUPPORTED_FILES = [
+    '.c', '.cpp', '.cs', '.css',
+    '.doc', '.docx', '.html',
+    '.java', '.js', '.json',
+    '.md',
+    '.pdf', '.php', '.pptx', '.py',
+    '.rb', '.sh', '.tex', '.ts', '.txt'
+]
+
+
+class UploadIndex:
+    '''File ids of uploaded files, keyed by purpose and SHA-256 of content.'''
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_cache_dir(), 'uploads.json')
+        self.lock = threading.Lock()
+        self.entries = read_json_state(self.path, {})
+
+    def get(self, digest, purpose):
+        with self.lock:
+            return self.entries.get(f'{purpose}:{digest}')
+
+    def set(self, digest, purpose, file_id):
+        with self.lock:
+            self.entries[f'{purpose}:{digest}'] = file_id
+
+    def discard(self, file_ids):
+        with self.lock:
+            self.entries = {
+                key: file_id
+                for key, file_id in self.entries.items()
+                if file_id not in file_ids
+            }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self.lock:
+            atomic_write(self.path, json.dumps(self.entries, indent=2, sort_keys=True) + '\n')
+
+
+def file_digest(path):
+    with open(path, 'rb') as fin:
+        return hashlib.file_digest(fin, 'sha256').hexdigest()
+
+
+def expand_paths(arg):
+    '''Split the argument into paths, expanding glob patterns.
+
+    A pattern which matches nothing is kept as is, so it can be reported.
+    '''
+    paths = []
+    for pattern in shlex.split(arg):
+        matches = sorted(glob.glob(os.path.expanduser(pattern), recursive=True))
+        paths += matches or [pattern]
+    return paths
+
+
+def upload_files(client: openai.OpenAI, paths, purpose='assistants', index=None, jobs=4):
+    '''Upload files concurrently, reusing files uploaded before.
+
+    A file whose content was uploaded already is not sent again as long as
+    the remote file can still be retrieved. Paths with the same content in
+    one call are uploaded once. Yields an outcome per path in order, with
+    a (file_id, reused) result.
+    '''
+    index = index or UploadIndex()
+    digests = {
+        outcome.item: outcome.result
+        for outcome in imap_ordered(file_digest, paths, jobs=jobs)
+        if not outcome.error
+    }
+
+    candidates = sorted({
+        index.get(digest, purpose)
+        for digest in digests.values()
+    } - {None})
+    missing = {
+        outcome.item
+        for outcome in imap_ordered(lambda file_id: retrieve_file(client, file_id), candidates, jobs=jobs)
+        if outcome.error
+    }
+    index.discard(missing)
+
+    # Paths sharing content are uploaded once, by the first of them. A path
+    # whose hashing failed is a key of its own.
+    keys = [digests.get(path, path) for path in paths]
+    first_paths = {}
+    for path, key in zip(paths, keys):
+        first_paths.setdefault(key, path)
+
+    def upload(key):
+        path = first_paths[key]
+        if path not in digests:
+            # Hashing failed, let attach_file raise the same error
+            return attach_file(client, path, purpose=purpose).id, False
+
+        file_id = index.get(key, purpose)
+        if file_id:
+            return file_id, True
+
+        file_id = attach_file(client, path, purpose=purpose).id
+        index.set(key, purpose, file_id)
+        return file_id, False
+
+    outcomes = {}
+    position = 0
+    try:
+        for outcome in imap_ordered(upload, list(first_paths), jobs=jobs):
+            outcomes[outcome.item] = outcome
+            # Yield the outcomes of the paths in order, as soon as their content is uploaded
+            while position < len(paths) and keys[position] in outcomes:
+                path, key = paths[position], keys[position]
+                result, error = outcomes[key].result, outcomes[key].error
+                if result and first_paths[key] != path:
+                    result = (result[0], True)
+                yield Outcome(path, result, error)
+                position += 1
+    finally:
+        index.save()
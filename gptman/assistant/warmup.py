@@ -0,0 +1,64 @@
+import queue
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+
+logger = logging.getLogger('gptman')
+
+
+class WarmThreadPool:
+    '''A few empty threads created ahead of time.
+
+    `acquire` hands out a ready thread at once and refills the pool in the
+    background, so thread creation stays off the critical path. Threads
+    never handed out are deleted by `close`.
+    '''
+
+    def __init__(self, client: openai.OpenAI, size=2):
+        self.client = client
+        self.size = size
+        self.ready = queue.Queue()
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.refill()
+
+    def refill(self):
+        with self.lock:
+            missing = self.size - self.ready.qsize() - self.pending
+            self.pending += max(missing, 0)
+
+        for _ in range(missing):
+            self.executor.submit(self.create_thread)
+
+    def create_thread(self):
+        try:
+            self.ready.put(self.client.beta.threads.create())
+        except openai.OpenAIError as ex:
+            logger.warning('Failed to create a thread in advance: %s', ex)
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def acquire(self):
+        try:
+            thread = self.ready.get_nowait()
+        except queue.Empty:
+            thread = self.client.beta.threads.create()
+
+        self.refill()
+        return thread
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+        while not self.ready.empty():
+            thread = self.ready.get_nowait()
+            try:
+                self.client.beta.threads.delete(thread.id)
+            except openai.OpenAIError as ex:
+                logger.warning('Failed to delete thread %s: %s', thread.id, ex)
@@ -0,0 +1,115 @@
+import os
+import time
+import queue
+import logging
+import threading
+
+from gptman.assistant.discover import find_prompt_files, is_prompt_file
+
+
+logger = logging.getLogger('gptman')
+
+DEBOUNCE = 0.3
+POLL_INTERVAL = 0.5
+
+
+def start_watcher(root, include=None, exclude=None, changes=None, poll_interval=POLL_INTERVAL):
+    '''Put paths of modified prompt files into the `changes` queue.
+
+    Uses watchdog (inotify, FSEvents, ...) if installed, and polls file
+    modification times otherwise. Returns a function to stop watching.
+    '''
+    try:
+        return start_watchdog(root, include, exclude, changes)
+    except ImportError:
+        logger.info('watchdog is not installed, poll every %ss', poll_interval)
+        return start_polling(root, include, exclude, changes, poll_interval)
+
+
+def start_watchdog(root, include, exclude, changes):
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if event.is_directory or event.event_type not in ('created', 'modified', 'moved'):
+                return
+            # Editors often save through a temporary file renamed to the prompt file
+            path = getattr(event, 'dest_path', None) or event.src_path
+            path = os.path.relpath(path, root)
+            if is_prompt_file(path, include, exclude):
+                changes.put(path)
+
+    observer = Observer()
+    observer.schedule(Handler(), root, recursive=True)
+    observer.start()
+
+    def stop():
+        observer.stop()
+        observer.join()
+    return stop
+
+
+def start_polling(root, include, exclude, changes, interval=POLL_INTERVAL):
+    stopped = threading.Event()
+
+    def scan():
+        mtimes = {}
+        for path in find_prompt_files(root, include, exclude):
+            try:
+                stat = os.stat(os.path.join(root, path))
+            except FileNotFoundError:
+                continue
+            mtimes[path] = (stat.st_mtime_ns, stat.st_size)
+        return mtimes
+
+    def poll():
+        mtimes = scan()
+        while not stopped.wait(interval):
+            current = scan()
+            for path, mtime in current.items():
+                if mtimes.get(path) != mtime:
+                    changes.put(path)
+            mtimes = current
+
+    thread = threading.Thread(target=poll, daemon=True)
+    thread.start()
+
+    def stop():
+        stopped.set()
+        thread.join()
+    return stop
+
+
+def collect_changes(changes, debounce=DEBOUNCE, timeout=None):
+    '''Wait for a change and return the paths changed until `debounce` seconds pass quietly.
+
+    Returns an empty set if nothing changed within `timeout`.
+    '''
+    try:
+        paths = {changes.get(timeout=timeout)}
+    except queue.Empty:
+        return set()
+
+    while True:
+        try:
+            paths.add(changes.get(timeout=debounce))
+        except queue.Empty:
+            return paths
+
+
+def watch(root, on_change, include=None, exclude=None, debounce=DEBOUNCE, poll_interval=POLL_INTERVAL):
+    '''Call `on_change` with the sorted paths of each burst of modified prompt files.
+
+    Runs until interrupted.
+    '''
+    changes = queue.Queue()
+    stop = start_watcher(root, include, exclude, changes, poll_interval)
+    try:
+        while True:
+            paths = collect_changes(changes, debounce)
+            existing = sorted(path for path in paths if os.path.isfile(os.path.join(root, path)))
+            if existing:
+                on_change(existing)
+    finally:
+        stop()
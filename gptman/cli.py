@@ -1,13 +1,22 @@
+import sys
 import argparse
 import logging
 
+from gptman import instrument
 from gptman.assistant import cli as assistant_cli
+from gptman.vectorstore import cli as vectorstore_cli
 
 
 def main():
     argparser = argparse.ArgumentParser()
     argparser.add_argument('-v', '--verbose', required=False, action='store_true')
     argparser.add_argument('--profile', required=False, action='store')
+    argparser.add_argument('--stats', action='store_true',
+                           help='print a summary of API calls and token usage at exit')
+    argparser.add_argument('--trace', metavar='PATH',
+                           help='write API calls and run usage to a JSON lines file')
+    argparser.add_argument('--metrics', metavar='PATH',
+                           help='write API metrics to a Prometheus textfile')
 
     subparsers = argparser.add_subparsers(required=True)
 
@@ -15,12 +24,32 @@ def main():
     assistant_subparsers = assistant_parser.add_subparsers(required=True)
     assistant_cli.setup_cli(assistant_subparsers)
 
+    vectorstore_parser = subparsers.add_parser('vectorstore')
+    vectorstore_subparsers = vectorstore_parser.add_subparsers(required=True)
+    vectorstore_cli.setup_cli(vectorstore_subparsers)
+
     args = argparser.parse_args()
 
     if args.verbose:
         logging.basicConfig(level=logging.DEBUG)
 
-    args.func(args)
+    recorder = instrument.enable_recording() \
+        if args.stats or args.trace or args.metrics else None
+
+    try:
+        args.func(args)
+    finally:
+        if recorder:
+            write_recording(recorder, args)
+
+
+def write_recording(recorder, args):
+    if args.trace:
+        recorder.write_trace(args.trace)
+    if args.metrics:
+        recorder.write_metrics(args.metrics)
+    if args.stats:
+        print(recorder.format_summary(), file=sys.stderr)
 
 
 if __name__ == '__main__':
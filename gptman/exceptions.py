@@ -2,6 +2,10 @@ class PreambleNotFound(Exception):
     'Preamble not found exception'
 
 
+class IncludeError(Exception):
+    'Included file not found or included recursively'
+
+
 class RequestTimeout(Exception):
     'Request timeout'
 
@@ -11,3 +15,19 @@ class NoSuchProfile(Exception):
         msg = f"Profile section [profile.{profile_name}] not found" if profile_name \
             else 'Default [gptman] section is not found'
         super().__init__(msg)
+
+
+class AssistantNotFound(Exception):
+    def __init__(self, asst_id):
+        super().__init__(f'Assistant {asst_id} not found')
+
+
+class RunFailed(Exception):
+    def __init__(self, run_obj):
+        self.run = run_obj
+        msg = f'Run {run_obj.id} is {run_obj.status}'
+        if getattr(run_obj, 'last_error', None):
+            msg += f': {run_obj.last_error.message}'
+        elif getattr(run_obj, 'incomplete_details', None):
+            msg += f': {run_obj.incomplete_details.reason}'
+        super().__init__(msg)
@@ -0,0 +1,61 @@
+import os
+import json
+import stat
+import logging
+import tempfile
+
+
+logger = logging.getLogger('gptman')
+
+
+def atomic_write(path, text):
+    '''Write text to path through a temporary file and rename.
+
+    Readers never observe a partially written file, and concurrent writers
+    of the same path leave one complete version behind.
+    '''
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fout:
+            fout.write(text)
+
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(temp_path, mode)
+
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_json_state(path, default):
+    '''Read a JSON state file, or return default if it is missing or broken.'''
+    try:
+        with open(path) as fin:
+            return json.load(fin)
+    except FileNotFoundError:
+        return default
+    except json.JSONDecodeError:
+        logger.warning('Ignore broken state file %s', path)
+        return default
+
+
+def write_if_changed(path, text):
+    '''Atomically write text to path unless the file already holds it.
+
+    Returns 'create', 'update' or 'unchanged'.
+    '''
+    try:
+        with open(path) as fin:
+            if fin.read() == text:
+                return 'unchanged'
+        status = 'update'
+    except FileNotFoundError:
+        status = 'create'
+
+    atomic_write(path, text)
+    return status
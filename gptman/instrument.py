@@ -0,0 +1,208 @@
+import re
+import json
+import time
+import logging
+import threading
+import statistics
+
+from collections import namedtuple, defaultdict
+
+from gptman.fileutils import atomic_write
+
+
+logger = logging.getLogger('gptman')
+
+Call = namedtuple('Call', ['method', 'endpoint', 'status', 'latency', 'retry', 'started_at'])
+RunUsage = namedtuple('RunUsage', ['run_id', 'assistant_id', 'status', 'prompt_tokens', 'completion_tokens'])
+
+# Path segments like asst_abc123 or file-abc123 are ids
+ID_PREFIXES = [
+    'asst_', 'thread_', 'run_', 'step_', 'msg_', 'file-', 'vs_', 'vsfb_',
+    'upload_', 'part_', 'batch_', 'ftjob-', 'resp_', 'call_',
+]
+ID_PATTERN = re.compile(
+    '^(?:{})[A-Za-z0-9_-]+$'.format('|'.join(re.escape(prefix) for prefix in ID_PREFIXES))
+)
+
+_recorder = None
+
+
+def enable_recording():
+    '''Start recording API calls of clients created from now on.'''
+    global _recorder
+    if _recorder is None:
+        _recorder = Recorder()
+    return _recorder
+
+
+def get_recorder():
+    return _recorder
+
+
+def record_run(run_obj):
+    '''Record token usage of a finished run, if recording is enabled.'''
+    if _recorder is not None:
+        _recorder.record_run(run_obj)
+
+
+def normalize_endpoint(path):
+    '''/v1/threads/thread_abc/runs/run_abc -> /threads/{id}/runs/{id}'''
+    segments = [segment for segment in path.split('/') if segment]
+    if segments and re.match(r'^v\d+$', segments[0]):
+        segments = segments[1:]
+    return '/' + '/'.join('{id}' if ID_PATTERN.match(segment) else segment for segment in segments)
+
+
+class Recorder:
+    '''API calls and run usage of the process.
+
+    Calls are recorded by httpx event hooks installed on the clients, so
+    every attempt of a retried request is a call of its own. The latency is
+    measured until the response headers arrive.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []
+        self.runs = []
+
+    def event_hooks(self, async_=False):
+        if async_:
+            async def on_request(request):
+                self.on_request(request)
+
+            async def on_response(response):
+                self.on_response(response)
+        else:
+            on_request, on_response = self.on_request, self.on_response
+
+        return {'request': [on_request], 'response': [on_response]}
+
+    def on_request(self, request):
+        request.extensions['gptman_started'] = (time.time(), time.perf_counter())
+
+    def on_response(self, response):
+        request = response.request
+        started_at, started = request.extensions.get('gptman_started', (time.time(), time.perf_counter()))
+        call = Call(
+            method=request.method,
+            endpoint=normalize_endpoint(request.url.path),
+            status=response.status_code,
+            latency=time.perf_counter() - started,
+            retry=int(request.headers.get('x-stainless-retry-count') or 0),
+            started_at=started_at,
+        )
+        logger.debug('%s %s %s %.3fs', call.method, call.endpoint, call.status, call.latency)
+        with self.lock:
+            self.calls.append(call)
+
+    def record_run(self, run_obj):
+        usage = getattr(run_obj, 'usage', None)
+        with self.lock:
+            self.runs.append(RunUsage(
+                run_id=run_obj.id,
+                assistant_id=run_obj.assistant_id,
+                status=run_obj.status,
+                prompt_tokens=usage.prompt_tokens if usage else 0,
+                completion_tokens=usage.completion_tokens if usage else 0,
+            ))
+
+    def summarize(self):
+        '''Return per endpoint rows of calls, errors, retries and latency.'''
+        with self.lock:
+            calls = list(self.calls)
+
+        by_endpoint = defaultdict(list)
+        for call in calls:
+            by_endpoint[(call.method, call.endpoint)].append(call)
+
+        rows = []
+        for (method, endpoint), endpoint_calls in sorted(by_endpoint.items()):
+            latencies = sorted(call.latency for call in endpoint_calls)
+            rows.append({
+                'method': method,
+                'endpoint': endpoint,
+                'calls': len(endpoint_calls),
+                'errors': sum(1 for call in endpoint_calls if call.status >= 400),
+                'retries': sum(1 for call in endpoint_calls if call.retry),
+                'total': sum(latencies),
+                'mean': statistics.mean(latencies),
+                'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            })
+        return rows
+
+    def format_summary(self):
+        from tabulate import tabulate
+
+        rows = self.summarize()
+        table = tabulate(
+            [
+                [
+                    row['method'], row['endpoint'], row['calls'], row['errors'], row['retries'],
+                    f"{row['total']:.2f}", f"{row['mean'] * 1000:.0f}", f"{row['p95'] * 1000:.0f}",
+                ]
+                for row in rows
+            ],
+            headers=['method', 'endpoint', 'calls', 'errors', 'retries', 'total s', 'mean ms', 'p95 ms'],
+            disable_numparse=True,
+        )
+
+        with self.lock:
+            runs = list(self.runs)
+        prompt_tokens = sum(run.prompt_tokens for run in runs)
+        completion_tokens = sum(run.completion_tokens for run in runs)
+        return (f'{table}\n'
+                f'{len(runs)} runs, {prompt_tokens} prompt tokens, {completion_tokens} completion tokens')
+
+    def write_trace(self, path):
+        '''Write calls and runs as JSON lines.'''
+        with self.lock:
+            lines = [
+                json.dumps({'type': 'call', **call._asdict()})
+                for call in self.calls
+            ] + [
+                json.dumps({'type': 'run', **run._asdict()})
+                for run in self.runs
+            ]
+        atomic_write(path, ''.join(line + '\n' for line in lines))
+
+    def write_metrics(self, path):
+        '''Write metrics in the Prometheus text format, for the node exporter textfile collector.'''
+        with self.lock:
+            calls = list(self.calls)
+            runs = list(self.runs)
+
+        requests = defaultdict(int)
+        durations = defaultdict(float)
+        retries = defaultdict(int)
+        for call in calls:
+            labels = f'method="{call.method}",endpoint="{call.endpoint}"'
+            requests[f'{labels},status="{call.status}"'] += 1
+            durations[labels] += call.latency
+            retries[labels] += 1 if call.retry else 0
+
+        lines = [
+            '# HELP gptman_api_requests_total API requests by endpoint and status.',
+            '# TYPE gptman_api_requests_total counter',
+        ] + [
+            f'gptman_api_requests_total{{{labels}}} {count}'
+            for labels, count in sorted(requests.items())
+        ] + [
+            '# HELP gptman_api_request_duration_seconds_total Seconds spent waiting for API responses.',
+            '# TYPE gptman_api_request_duration_seconds_total counter',
+        ] + [
+            f'gptman_api_request_duration_seconds_total{{{labels}}} {seconds:.6f}'
+            for labels, seconds in sorted(durations.items())
+        ] + [
+            '# HELP gptman_api_retries_total Retried API requests.',
+            '# TYPE gptman_api_retries_total counter',
+        ] + [
+            f'gptman_api_retries_total{{{labels}}} {count}'
+            for labels, count in sorted(retries.items())
+        ] + [
+            '# HELP gptman_run_tokens_total Tokens used by runs.',
+            '# TYPE gptman_run_tokens_total counter',
+            f'gptman_run_tokens_total{{type="prompt"}} {sum(run.prompt_tokens for run in runs)}',
+            f'gptman_run_tokens_total{{type="completion"}} {sum(run.completion_tokens for run in runs)}',
+        ]
+        atomic_write(path, '\n'.join(lines) + '\n')
@@ -1,11 +1,15 @@
 import os
-import openai
+import json
 import logging
+import weakref
 import tomllib
+import threading
 
 from enum import Enum
 
 from gptman import exceptions as exc
+from gptman.instrument import get_recorder
+from gptman.ratelimit import get_rate_limiter
 
 logger = logging.getLogger('gptman')
 
@@ -15,6 +19,13 @@ class Backend(Enum):
     azure = 'azure'
 
 
+_settings_cache = {}
+_client_cache = {}
+# Async clients by event loop, as their connection pools are bound to the loop
+_async_client_cache = weakref.WeakKeyDictionary()
+_client_cache_lock = threading.Lock()
+
+
 def read_settings(candidates=None):
     settings_path_candidates = candidates or [
         'gptman.toml',
@@ -25,12 +36,23 @@ def read_settings(candidates=None):
         if not os.path.isfile(path):
             continue
 
-        logging.getLogger(__name__).info('Found settings file at %s', path)
-        with open(path, "rb") as f:
-            return tomllib.load(f)
+        # Parse the file again only when it is modified
+        cache_key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+        if cache_key not in _settings_cache:
+            logging.getLogger(__name__).info('Found settings file at %s', path)
+            with open(path, "rb") as f:
+                _settings_cache[cache_key] = tomllib.load(f)
+        return _settings_cache[cache_key]
+
 
+def get_cache_dir():
+    return os.getenv('GPTMAN_CACHE_DIR') or os.path.join(
+        os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+        'gptman',
+    )
 
-def get_client(settings=None, profile=None):
+
+def get_profile_settings(settings=None, profile=None):
     settings = settings or read_settings()
 
     _profile = profile if profile else os.getenv('GPTMAN_PROFILE') or None
@@ -40,27 +62,118 @@ def get_client(settings=None, profile=None):
     else:
         logger.info('Use default profile [gptman]')
 
+    if not _profile:
+        return get_default_settings(settings)
+
+    try:
+        return settings.get('profile', {})[_profile]
+    except KeyError:
+        raise exc.NoSuchProfile(_profile)
+
+
+def get_default_settings(settings=None):
+    '''Return the default [gptman] section, whatever GPTMAN_PROFILE is.'''
+    settings = settings or read_settings()
     try:
-        profile_settings = settings.get('profile', {})[_profile] if _profile \
-            else settings['gptman']
-    except KeyError as ex:
-        key = ex.args[0]
-        profile_name = key if key != 'gptman' else None
-        raise exc.NoSuchProfile(profile_name)
+        return settings['gptman']
+    except KeyError:
+        raise exc.NoSuchProfile(None)
+
+
+def get_client(settings=None, profile=None, async_=False, profile_settings=None):
+    '''Return a client for the profile, or for the given profile settings.
+
+    Clients are cached by profile settings, so repeated calls share one
+    connection pool. Async clients are cached per running event loop, and
+    a new one is returned when there is no running loop. HTTP options are read from the `http` table of the
+    profile:
+
+        [gptman.http]
+        timeout = 60
+        connect_timeout = 5
+        max_retries = 2
+        max_connections = 100
+        max_keepalive_connections = 20
+        keepalive_expiry = 30
+    '''
+    profile_settings = profile_settings or get_profile_settings(settings, profile)
+    recorder = get_recorder()
+
+    cache_key = (id(recorder), json.dumps(profile_settings, sort_keys=True, default=str))
+    with _client_cache_lock:
+        cache = _client_cache
+        if async_:
+            import asyncio
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return create_client(profile_settings, async_=True, recorder=recorder)
+            cache = _async_client_cache.setdefault(loop, {})
+
+        if cache_key not in cache:
+            cache[cache_key] = create_client(profile_settings, async_=async_, recorder=recorder)
+        return cache[cache_key]
+
+
+def create_client(profile_settings, async_=False, recorder=None):
+    import openai
 
     backend = Backend[profile_settings.get('backend', 'openai')]
 
     kwargs = {'api_key': profile_settings['api_key']}
 
     if backend == Backend.openai:
-        client_class = openai.OpenAI
+        client_class = openai.AsyncOpenAI if async_ else openai.OpenAI
+        if 'base_url' in profile_settings:
+            kwargs['base_url'] = profile_settings['base_url']
     elif backend == Backend.azure:
-        client_class = openai.lib.azure.AzureOpenAI
+        client_class = openai.lib.azure.AsyncAzureOpenAI if async_ \
+            else openai.lib.azure.AzureOpenAI
         kwargs['azure_endpoint'] = profile_settings['azure_endpoint']
         kwargs['api_version'] = profile_settings['api_version']
         if 'azure_deployment' in profile_settings:
             kwargs['azure_deployment'] = profile_settings['azure_deployment']
 
+    # The rate limiter goes first, so the recorded latency excludes queueing
+    hooks = [get_rate_limiter(profile_settings)] + ([recorder] if recorder else [])
+    kwargs.update(get_http_options(profile_settings.get('http', {}), async_=async_, hooks=hooks))
+
     return client_class(**kwargs)
 
 
+def get_http_options(http_settings, async_=False, hooks=()):
+    import openai
+
+    kwargs = {}
+    http_client_kwargs = {}
+
+    if 'max_retries' in http_settings:
+        kwargs['max_retries'] = http_settings['max_retries']
+
+    # httpx is imported through openai, which may depend on a fork of it
+    if 'timeout' in http_settings or 'connect_timeout' in http_settings:
+        kwargs['timeout'] = openai.Timeout(
+            http_settings.get('timeout', 600),
+            connect=http_settings.get('connect_timeout', 5),
+        )
+
+    limit_keys = ['max_connections', 'max_keepalive_connections', 'keepalive_expiry']
+    if any(key in http_settings for key in limit_keys):
+        defaults = openai.DEFAULT_CONNECTION_LIMITS
+        http_client_kwargs['limits'] = type(defaults)(**{
+            key: http_settings.get(key, getattr(defaults, key))
+            for key in limit_keys
+        })
+
+    event_hooks = {}
+    for hook in hooks:
+        for event, funcs in hook.event_hooks(async_=async_).items():
+            event_hooks.setdefault(event, []).extend(funcs)
+    if event_hooks:
+        http_client_kwargs['event_hooks'] = event_hooks
+
+    if http_client_kwargs:
+        http_client_class = openai.DefaultAsyncHttpxClient if async_ else openai.DefaultHttpxClient
+        kwargs['http_client'] = http_client_class(**http_client_kwargs)
+
+    return kwargs
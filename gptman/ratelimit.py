@@ -0,0 +1,259 @@
+import re
+import json
+import time
+import logging
+import threading
+
+from collections import deque, namedtuple
+
+
+logger = logging.getLogger('gptman')
+
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+# A request of an async client waiting in the queue, woken through its event loop
+AsyncTicket = namedtuple('AsyncTicket', ['loop', 'event'])
+
+_limiter_cache = {}
+_limiter_cache_lock = threading.Lock()
+
+
+def parse_duration(value):
+    '''Parse a reset duration like 1s, 20ms or 6m0s into seconds.'''
+    if not value:
+        return None
+    matches = DURATION_PATTERN.findall(value)
+    if not matches:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in matches)
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_rate_limiter(profile_settings):
+    '''Return the rate limiter shared by every client of the profile.'''
+    cache_key = json.dumps(profile_settings, sort_keys=True, default=str)
+    with _limiter_cache_lock:
+        if cache_key not in _limiter_cache:
+            _limiter_cache[cache_key] = RateLimiter.from_settings(profile_settings)
+        return _limiter_cache[cache_key]
+
+
+def estimate_tokens(request):
+    '''Roughly estimate tokens a request consumes, about 4 bytes per token.
+
+    Only requests which start runs consume tokens. The estimate is
+    corrected by the remaining tokens reported in the response headers.
+    '''
+    if request.method != 'POST' or not request.url.path.endswith('/runs'):
+        return 0
+    try:
+        return len(request.content) // 4
+    except Exception:
+        return 0
+
+
+class TokenBucket:
+    '''A budget refilled at `per_minute` and holding at most `per_minute`.
+
+    A bucket without a rate never makes callers wait until the rate is
+    learned from the response headers.
+    '''
+
+    def __init__(self, per_minute=None, clock=time.monotonic):
+        self.clock = clock
+        self.configured = per_minute is not None
+        self.per_minute = per_minute
+        self.available = per_minute
+        self.updated = clock()
+        self.paused_until = 0
+
+    def refill(self):
+        now = self.clock()
+        if self.per_minute:
+            self.available = min(self.per_minute, self.available + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+        return now
+
+    def wait_time(self, amount):
+        '''Return seconds until `amount` can be taken, 0 if it can be now.'''
+        now = self.refill()
+        if self.paused_until > now:
+            return self.paused_until - now
+        if not self.per_minute:
+            return 0
+        # A request larger than the bucket is let through when it is full
+        amount = min(amount, self.per_minute)
+        if self.available >= amount:
+            return 0
+        return (amount - self.available) * 60 / self.per_minute
+
+    def take(self, amount):
+        if self.per_minute:
+            self.available -= amount
+
+    def update(self, limit=None, remaining=None, reset=None):
+        now = self.refill()
+        if limit and not self.configured and limit != self.per_minute:
+            logger.debug('Learned rate limit of %s per minute', limit)
+            self.available = limit if self.per_minute is None else self.available
+            self.per_minute = limit
+        if remaining is not None and self.per_minute:
+            self.available = min(self.available, remaining)
+        if remaining == 0 and reset:
+            self.pause(reset, now)
+
+    def pause(self, seconds, now=None):
+        now = now or self.clock()
+        self.paused_until = max(self.paused_until, now + seconds)
+
+
+class RateLimiter:
+    '''Schedule requests of a profile within its request and token budgets.
+
+    Every request of the clients of a profile waits for both budgets in
+    first come, first served order, so concurrent commands share the
+    budget fairly. Budgets are learned from the `x-ratelimit-*` response
+    headers, or set per profile in gptman.toml:
+
+        [gptman.ratelimit]
+        requests_per_minute = 500
+        tokens_per_minute = 200000
+
+    A 429 response pauses all requests until the time given by the server.
+    Requests of async clients wait on their event loop, without a thread.
+    '''
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, enabled=True,
+                 clock=time.monotonic):
+        self.enabled = enabled
+        self.requests = TokenBucket(requests_per_minute, clock=clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock)
+        self.condition = threading.Condition()
+        self.queue = deque()
+
+    @classmethod
+    def from_settings(cls, profile_settings):
+        return cls(**(profile_settings or {}).get('ratelimit', {}))
+
+    def wait_time(self, tokens):
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    def acquire(self, tokens=0):
+        '''Block until the request may be sent and return the seconds waited.'''
+        started = time.monotonic()
+        ticket = object()
+        with self.condition:
+            self.queue.append(ticket)
+            try:
+                while True:
+                    if self.queue[0] is not ticket:
+                        self.condition.wait()
+                        continue
+
+                    wait = self.wait_time(tokens)
+                    if wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        break
+                    self.condition.wait(wait)
+            finally:
+                self.queue.remove(ticket)
+                self.notify()
+
+        return self.log_wait(started)
+
+    async def acquire_async(self, tokens=0):
+        '''Wait until the request may be sent and return the seconds waited.
+
+        A cancelled request leaves the queue without taking any budget.
+        '''
+        import asyncio
+
+        started = time.monotonic()
+        ticket = AsyncTicket(asyncio.get_running_loop(), asyncio.Event())
+        with self.condition:
+            self.queue.append(ticket)
+        try:
+            while True:
+                with self.condition:
+                    # Only the first request in the queue waits for the budget, others until they are first
+                    wait = None
+                    if self.queue[0] is ticket:
+                        wait = self.wait_time(tokens)
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            break
+                    ticket.event.clear()
+                try:
+                    await asyncio.wait_for(ticket.event.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self.condition:
+                self.queue.remove(ticket)
+                self.notify()
+
+        return self.log_wait(started)
+
+    def notify(self):
+        '''Wake the waiting requests, with the condition held.'''
+        self.condition.notify_all()
+        if self.queue and isinstance(self.queue[0], AsyncTicket):
+            head = self.queue[0]
+            try:
+                head.loop.call_soon_threadsafe(head.event.set)
+            except RuntimeError:
+                # The event loop is closed
+                pass
+
+    def log_wait(self, started):
+        waited = time.monotonic() - started
+        if waited > 0.01:
+            logger.debug('Waited %.2fs for the rate limit', waited)
+        return waited
+
+    def update(self, status, headers):
+        '''Adjust the budgets from the response.'''
+        with self.condition:
+            for kind, bucket in [('requests', self.requests), ('tokens', self.tokens)]:
+                bucket.update(
+                    limit=parse_int(headers.get(f'x-ratelimit-limit-{kind}')),
+                    remaining=parse_int(headers.get(f'x-ratelimit-remaining-{kind}')),
+                    reset=parse_duration(headers.get(f'x-ratelimit-reset-{kind}')),
+                )
+
+            if status == 429:
+                retry_after = parse_int(headers.get('retry-after-ms'))
+                retry_after = retry_after / 1000 if retry_after is not None \
+                    else parse_int(headers.get('retry-after'))
+                logger.info('Rate limited, pause requests for %ss', retry_after)
+                self.requests.pause(retry_after if retry_after is not None else 1)
+
+            self.notify()
+
+    def event_hooks(self, async_=False):
+        if not self.enabled:
+            return {}
+
+        if async_:
+            async def on_request(request):
+                await self.acquire_async(estimate_tokens(request))
+
+            async def on_response(response):
+                self.update(response.status_code, response.headers)
+        else:
+            def on_request(request):
+                self.acquire(estimate_tokens(request))
+
+            def on_response(response):
+                self.update(response.status_code, response.headers)
+
+        return {'request': [on_request], 'response': [on_response]}
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import os
+import json
+import logging
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import openai
+
+from gptman.fileutils import atomic_write, read_json_state
+from gptman.workers import imap_ordered
+from gptman.assistant import attach_file
+from gptman.assistant.manifest import STATE_DIR
+from gptman.assistant.uploads import SUPPORTED_FILES, file_digest
+
+
+logger = logging.getLogger('gptman')
+
+# Maximum number of files in a single file batch
+BATCH_SIZE = 500
+
+
+def manifest_path(vector_store_id):
+    return os.path.join(STATE_DIR, 'vectorstores', f'{vector_store_id}.json')
+
+
+def read_manifest(path):
+    return read_json_state(path, {})
+
+
+def write_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write(path, json.dumps(manifest, indent=2, sort_keys=True) + '\n')
+
+
+def find_documents(directory):
+    '''Relative paths of the supported files under directory, skipping hidden directories.'''
+    paths = []
+    for root, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [dirname for dirname in dirnames if not dirname.startswith('.')]
+        paths += [
+            os.path.relpath(os.path.join(root, filename), directory)
+            for filename in filenames
+            if os.path.splitext(filename)[1] in SUPPORTED_FILES
+        ]
+    return sorted(paths)
+
+
+def plan_sync(directory, manifest, jobs=4):
+    '''Compare the directory with the manifest.
+
+    Returns the relative paths to upload with their digests, and the
+    relative paths whose files should be removed from the vector store.
+    '''
+    documents = find_documents(directory)
+    digests = {
+        outcome.item: outcome.result
+        for outcome in imap_ordered(
+            lambda path: file_digest(os.path.join(directory, path)), documents, jobs=jobs
+        )
+        if not outcome.error
+    }
+
+    to_upload = {
+        path: digest
+        for path, digest in digests.items()
+        if manifest.get(path, {}).get('sha256') != digest
+    }
+    to_remove = [
+        path
+        for path in manifest
+        if path not in digests or path in to_upload
+    ]
+    return to_upload, to_remove
+
+
+def add_files(client: openai.OpenAI, vector_store_id, file_ids):
+    '''Add a batch of files to the vector store and return the ids that failed or were cancelled.'''
+    batch = client.vector_stores.file_batches.create_and_poll(vector_store_id, file_ids=file_ids)
+    logger.debug(batch)
+    failed_ids = set()
+    for status, count in [('failed', batch.file_counts.failed), ('cancelled', batch.file_counts.cancelled)]:
+        if count:
+            failed_ids |= {
+                vs_file.id
+                for vs_file in client.vector_stores.file_batches.list_files(
+                    batch.id, vector_store_id=vector_store_id, filter=status,
+                )
+            }
+    return failed_ids
+
+
+def remove_file(client: openai.OpenAI, vector_store_id, file_id):
+    import openai
+
+    try:
+        client.vector_stores.files.delete(file_id, vector_store_id=vector_store_id)
+    except openai.NotFoundError:
+        pass
+    try:
+        client.files.delete(file_id)
+    except openai.NotFoundError:
+        pass
+
+
+def sync_directory(client: openai.OpenAI, vector_store_id, directory, jobs=4, dry_run=False):
+    '''Mirror the directory into the vector store.
+
+    Only new and changed files are uploaded and changed or deleted ones are
+    removed. Files are uploaded and added in batches, and the manifest is
+    written after each batch, so an interrupted sync resumes where it
+    stopped. Files of a batch which cannot be added are deleted again. The
+    old version of a changed file is removed once the new one is in the
+    vector store. Returns the numbers of uploaded, removed and failed files.
+    '''
+    path = manifest_path(vector_store_id)
+    manifest = read_manifest(path)
+    to_upload, to_remove = plan_sync(directory, manifest, jobs=jobs)
+    to_delete = [rel_path for rel_path in to_remove if rel_path not in to_upload]
+
+    for rel_path in to_upload:
+        print(f'upload {rel_path}')
+    for rel_path in to_delete:
+        print(f'remove {rel_path}')
+
+    result = {'uploaded': 0, 'removed': 0, 'failed': 0}
+    if dry_run:
+        return result
+
+    uploaded_ids = []
+
+    def upload(rel_path):
+        file_id = attach_file(client, os.path.join(directory, rel_path)).id
+        uploaded_ids.append(file_id)
+        return file_id
+
+    def remove(item):
+        rel_path, file_id = item
+        remove_file(client, vector_store_id, file_id)
+
+    def remove_all(items):
+        '''Remove (rel_path, file_id) items and return the removed paths.'''
+        removed = []
+        for outcome in imap_ordered(remove, items, jobs=jobs):
+            if outcome.error:
+                print(f'error {outcome.item[0]}: {outcome.error}')
+                result['failed'] += 1
+                continue
+            removed.append(outcome.item[0])
+            result['removed'] += 1
+        return removed
+
+    def discard_uploads():
+        for outcome in imap_ordered(lambda file_id: remove_file(client, vector_store_id, file_id),
+                                    uploaded_ids, jobs=jobs):
+            if outcome.error:
+                logger.warning('Failed to delete uploaded file %s: %s', outcome.item, outcome.error)
+
+    rel_paths = list(to_upload)
+    try:
+        for start in range(0, len(rel_paths), BATCH_SIZE):
+            uploaded_ids.clear()
+            uploaded = {}
+            try:
+                for outcome in imap_ordered(upload, rel_paths[start:start + BATCH_SIZE], jobs=jobs):
+                    if outcome.error:
+                        print(f'error {outcome.item}: {outcome.error}')
+                        result['failed'] += 1
+                        continue
+                    uploaded[outcome.result] = outcome.item
+
+                failed_ids = add_files(client, vector_store_id, list(uploaded)) if uploaded else set()
+            except BaseException:
+                # Files not recorded in the manifest would be uploaded again by the next sync
+                discard_uploads()
+                raise
+
+            replaced = []
+            for file_id, rel_path in uploaded.items():
+                if file_id in failed_ids:
+                    print(f'error {rel_path}: failed to add to the vector store')
+                    remove_file(client, vector_store_id, file_id)
+                    result['failed'] += 1
+                    continue
+                if rel_path in manifest:
+                    replaced.append((rel_path, manifest[rel_path]['file_id']))
+                manifest[rel_path] = {'sha256': to_upload[rel_path], 'file_id': file_id}
+                result['uploaded'] += 1
+            write_manifest(path, manifest)
+            remove_all(replaced)
+
+        for rel_path in remove_all([(rel_path, manifest[rel_path]['file_id']) for rel_path in to_delete]):
+            del manifest[rel_path]
+    finally:
+        write_manifest(path, manifest)
+
+    return result
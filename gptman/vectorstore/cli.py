@@ -0,0 +1,27 @@
+import sys
+
+from gptman.main import get_client
+from gptman.vectorstore import sync_directory
+
+
+def sync(args):
+    client = get_client(profile=args.profile)
+    result = sync_directory(client, args.id, args.directory, jobs=args.jobs, dry_run=args.dry_run)
+
+    print(f"{result['uploaded']} uploaded, {result['removed']} removed, {result['failed']} failed")
+
+    if result['failed']:
+        sys.exit(1)
+
+    return result
+
+
+def setup_cli(vectorstore_subparsers):
+    sync_parser = vectorstore_subparsers.add_parser('sync')
+    sync_parser.add_argument('directory')
+    sync_parser.add_argument('--id', required=True, help='vector store id')
+    sync_parser.add_argument('-j', '--jobs', type=int, default=4,
+                             help='number of files uploaded or removed concurrently')
+    sync_parser.add_argument('-n', '--dry-run', action='store_true',
+                             help='print changes without applying them')
+    sync_parser.set_defaults(func=sync)
@@ -0,0 +1,37 @@
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+Outcome = namedtuple('Outcome', ['item', 'result', 'error'])
+
+
+def _call(func, item):
+    try:
+        return Outcome(item, func(item), None)
+    except Exception as ex:
+        return Outcome(item, None, ex)
+
+
+def imap_ordered(func, items, jobs=1):
+    '''Apply `func` to each item on up to `jobs` threads.
+
+    Outcomes are yielded in input order and an exception raised by `func`
+    is captured in its outcome instead of aborting the remaining items.
+    '''
+    if jobs <= 1:
+        for item in items:
+            yield _call(func, item)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(_call, func, item))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
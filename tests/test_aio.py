@@ -0,0 +1,115 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+
+from openai.types.beta.threads import TextContentBlock, Text
+
+from gptman import exceptions as exc
+from gptman.assistant import aio
+from gptman.assistant.polling import PollingPolicy
+from gptman.main import get_client
+
+
+def make_run(status):
+    return Mock(id='run_a', thread_id='thread_a', status=status)
+
+
+def make_client():
+    client = MagicMock()
+    client.beta.assistants.update = AsyncMock(return_value='return_value')
+    client.beta.threads.runs.create = AsyncMock(return_value=make_run('queued'))
+    client.beta.threads.runs.retrieve = AsyncMock(return_value=make_run('completed'))
+    client.beta.threads.runs.cancel = AsyncMock()
+    client.beta.threads.messages.create = AsyncMock()
+    client.beta.threads.messages.list = AsyncMock(return_value=Mock(data=[
+        Mock(role='assistant', content=[TextContentBlock(type='text', text=Text(value='Hello', annotations=[]))]),
+    ]))
+    return client
+
+
+def test_get_async_client():
+    settings = {
+        'gptman': {
+            'backend': 'openai',
+            'api_key': 'fake-api-key',
+        }
+    }
+    assert type(get_client(settings, async_=True)).__name__ == 'AsyncOpenAI'
+
+
+def test_async_client_per_event_loop():
+    settings = {
+        'gptman': {
+            'backend': 'openai',
+            'api_key': 'fake-api-key',
+        }
+    }
+
+    async def get_clients():
+        return get_client(settings, async_=True), get_client(settings, async_=True)
+
+    first, same = asyncio.run(get_clients())
+    second, _ = asyncio.run(get_clients())
+
+    assert first is same
+    # A client of a closed loop is never reused
+    assert second is not first
+
+
+def test_update_instruction():
+    client = make_client()
+
+    result = asyncio.run(aio.update_instruction(client, 'test_asst', tools='file_search'))
+
+    assert result == 'return_value'
+    client.beta.assistants.update.assert_called_with(
+        'test_asst',
+        tools=[{'type': 'file_search'}]
+    )
+
+
+def test_send_message():
+    client = make_client()
+    policy = PollingPolicy(initial_interval=0)
+
+    result = asyncio.run(aio.send_message(client, 'asst_a', Mock(id='thread_a'), 'Hi', policy=policy))
+
+    assert result == 'Hello'
+    client.beta.threads.runs.create.assert_called_with(
+        thread_id='thread_a',
+        assistant_id='asst_a',
+        additional_messages=[{'role': 'user', 'content': 'Hi'}],
+    )
+    client.beta.threads.messages.create.assert_not_called()
+
+
+def test_stream_assistant_records_run():
+    client = make_client()
+    stream = client.beta.threads.runs.stream.return_value.__aenter__.return_value
+
+    async def text_deltas():
+        yield 'Hello'
+
+    stream.text_deltas = text_deltas()
+    stream.get_final_run = AsyncMock(return_value=make_run('completed'))
+    stream.get_final_messages = AsyncMock(return_value=[
+        Mock(role='assistant', content=[TextContentBlock(type='text', text=Text(value='Hello', annotations=[]))]),
+    ])
+
+    with patch.object(aio, 'record_run') as record_run:
+        result = asyncio.run(aio.stream_assistant(client, 'asst_a', Mock(id='thread_a')))
+
+    assert result == 'Hello'
+    record_run.assert_called_once_with(stream.get_final_run.return_value)
+
+
+def test_poll_run_timeout_cancels_run():
+    client = make_client()
+    client.beta.threads.runs.retrieve.return_value = make_run('in_progress')
+    policy = PollingPolicy(initial_interval=0.001, timeout=0.01)
+
+    with pytest.raises(exc.RequestTimeout):
+        asyncio.run(aio.poll_run(client, make_run('queued'), policy))
+
+    client.beta.threads.runs.cancel.assert_called_with('run_a', thread_id='thread_a')
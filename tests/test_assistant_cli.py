@@ -0,0 +1,238 @@
+from argparse import Namespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from gptman.assistant import cli
+from gptman.assistant.ids import AssistantIds
+from gptman.assistant.prompt import read_prompt_file
+
+
+def push_args(**kwargs):
+    defaults = {
+        'path': None, 'profile': None, 'profiles': None, 'jobs': 1, 'force': False, 'diff': False,
+        'include': None, 'exclude': None,
+    }
+    return Namespace(**{**defaults, **kwargs})
+
+
+def write_prompt(path, preamble, instructions='Test prompt'):
+    lines = ['---'] + [f'{k}: {v}' for k, v in preamble.items()] + ['---', instructions]
+    path.write_text('\n'.join(lines) + '\n')
+
+
+class TestPush:
+    def test_push_prompt_update(self, tmp_path):
+        path = tmp_path / 'a.md'
+        write_prompt(path, {'id': 'asst_a', 'name': 'a'})
+        client = Mock()
+
+        action, data, _ = cli.push_prompt(client, path)
+
+        assert action == 'update'
+        assert data['id'] == 'asst_a'
+        client.beta.assistants.update.assert_called_with(
+            'asst_a', name='a', instructions='Test prompt\n')
+
+    def test_push_prompt_create_writes_id(self, tmp_path):
+        path = tmp_path / 'b.md'
+        write_prompt(path, {'name': 'b'})
+        client = Mock()
+        client.beta.assistants.create.return_value = Mock(id='asst_new')
+
+        action, data, _ = cli.push_prompt(client, path)
+
+        assert action == 'create'
+        assert read_prompt_file(path)['id'] == 'asst_new'
+
+    def test_push_concurrently_reports_each_file(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        paths = []
+        for idx in range(6):
+            path = tmp_path / f'{idx}.md'
+            write_prompt(path, {'id': f'asst_{idx}', 'name': str(idx)})
+            paths.append(str(path))
+        paths.append(str(tmp_path / 'missing.md'))
+
+        args = push_args(path=paths, jobs=4)
+        with patch.object(cli, 'get_client', return_value=Mock()):
+            with pytest.raises(SystemExit):
+                cli.push(args)
+
+        lines = capsys.readouterr().out.splitlines()
+        assert [line.split()[1] for line in lines[:-1]] == [
+            path + ':' if path.endswith('missing.md') else path
+            for path in paths
+        ]
+        assert lines[-1] == '6 updated, 0 created, 0 unchanged, 1 failed'
+
+    def test_push_skips_unchanged_prompts(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        write_prompt(tmp_path / 'a.md', {'id': 'asst_a', 'name': 'a'})
+        write_prompt(tmp_path / 'b.md', {'id': 'asst_b', 'name': 'b'})
+        client = Mock()
+
+        def run_push(force=False):
+            args = push_args(path=['a.md', 'b.md'], force=force)
+            with patch.object(cli, 'get_client', return_value=client):
+                cli.push(args)
+            return capsys.readouterr().out.splitlines()[-1]
+
+        assert run_push() == '2 updated, 0 created, 0 unchanged, 0 failed'
+        assert run_push() == '0 updated, 0 created, 2 unchanged, 0 failed'
+
+        write_prompt(tmp_path / 'b.md', {'id': 'asst_b', 'name': 'b'}, 'Changed prompt')
+        assert run_push() == '1 updated, 0 created, 1 unchanged, 0 failed'
+        assert run_push(force=True) == '2 updated, 0 created, 0 unchanged, 0 failed'
+
+    def test_push_resolves_includes_of_affected_prompts(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'shared').mkdir()
+        (tmp_path / 'shared/policy.md').write_text('Be polite.\n')
+        write_prompt(tmp_path / 'a.md', {'id': 'asst_a', 'name': 'a'}, 'A\n<!-- include: shared/policy.md -->')
+        write_prompt(tmp_path / 'b.md', {'id': 'asst_b', 'name': 'b'})
+        client = Mock()
+
+        def run_push():
+            client.reset_mock()
+            args = push_args()
+            with patch.object(cli, 'get_client', return_value=client):
+                cli.push(args)
+            return capsys.readouterr().out.splitlines()[-1]
+
+        assert run_push() == '2 updated, 0 created, 0 unchanged, 0 failed'
+        client.beta.assistants.update.assert_any_call('asst_a', name='a', instructions='A\nBe polite.\n')
+
+        (tmp_path / 'shared/policy.md').write_text('Be very polite.\n')
+        assert run_push() == '1 updated, 0 created, 1 unchanged, 0 failed'
+        client.beta.assistants.update.assert_called_once_with('asst_a', name='a', instructions='A\nBe very polite.\n')
+
+    def test_push_to_profiles(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        write_prompt(tmp_path / 'a.md', {'id': 'asst_a', 'name': 'a'})
+        write_prompt(tmp_path / 'b.md', {'name': 'b'})
+        (tmp_path / 'gptman.toml').write_text(
+            '[gptman]\napi_key = "default-key"\n\n[profile.eu]\napi_key = "eu-key"\n')
+        # The default profile is the [gptman] section, whatever GPTMAN_PROFILE is
+        monkeypatch.setenv('GPTMAN_PROFILE', 'eu')
+        clients = {'default-key': Mock(), 'eu-key': Mock()}
+        clients['default-key'].beta.assistants.create.return_value = Mock(id='asst_b')
+        clients['eu-key'].beta.assistants.create.side_effect = [Mock(id='asst_eu_1'), Mock(id='asst_eu_2')]
+
+        def get_client(profile_settings):
+            return clients[profile_settings['api_key']]
+
+        args = push_args(path=['a.md', 'b.md'], profiles='default,eu')
+        with patch.object(cli, 'get_client', side_effect=get_client):
+            cli.push(args)
+
+        clients['default-key'].beta.assistants.update.assert_called_once()
+        assert clients['eu-key'].beta.assistants.create.call_count == 2
+        assert read_prompt_file(tmp_path / 'b.md')['id'] == 'asst_b'
+        assert set(AssistantIds().get(path, 'eu') for path in ['a.md', 'b.md']) == {'asst_eu_1', 'asst_eu_2'}
+
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0].split() == ['prompt', 'default', 'eu']
+        assert lines[2].split() == ['a.md', 'update', 'create']
+        assert lines[3].split() == ['b.md', 'create', 'create']
+        assert lines[-1] == '1 updated, 3 created, 0 unchanged, 0 failed'
+
+        with patch.object(cli, 'get_client', side_effect=get_client):
+            cli.push(args)
+        assert capsys.readouterr().out.splitlines()[-1] == '0 updated, 0 created, 4 unchanged, 0 failed'
+
+    def test_push_with_diff_sends_changed_fields(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        write_prompt(tmp_path / 'a.md', {'id': 'asst_a', 'name': 'a', 'model': 'gpt-4o'})
+        write_prompt(tmp_path / 'b.md', {'id': 'asst_b', 'name': 'b', 'model': 'gpt-4o'})
+        client = Mock()
+        client.beta.assistants.list.return_value = [
+            Mock(id='asst_a', model='gpt-4o', instructions='Test prompt', tools=[]),
+            Mock(id='asst_b', model='gpt-4o-mini', instructions='Test prompt', tools=[]),
+        ]
+        client.beta.assistants.list.return_value[0].name = 'a'
+        client.beta.assistants.list.return_value[1].name = 'b'
+
+        args = push_args(path=['a.md', 'b.md'], diff=True)
+        with patch.object(cli, 'get_client', return_value=client):
+            cli.push(args)
+
+        client.beta.assistants.list.assert_called_once_with(limit=100)
+        client.beta.assistants.update.assert_called_once_with('asst_b', model='gpt-4o')
+        lines = capsys.readouterr().out.splitlines()
+        assert "  model: 'gpt-4o-mini' -> 'gpt-4o'" in lines
+        assert lines[-1] == '1 updated, 0 created, 1 unchanged, 0 failed'
+
+
+class TestPull:
+    def test_pull_skips_identical_files(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        write_prompt(tmp_path / 'a.md', {'id': 'asst_a', 'name': 'a', 'model': 'gpt-4o'})
+        write_prompt(tmp_path / 'renamed.md', {'id': 'asst_b', 'name': 'b', 'model': 'gpt-4o'})
+        mtime = (tmp_path / 'a.md').stat().st_mtime_ns
+
+        assistants = [
+            Mock(id='asst_a', model='gpt-4o', instructions='Test prompt\n'),
+            Mock(id='asst_b', model='gpt-4o', instructions='Changed prompt\n'),
+            Mock(id='asst_c', model='gpt-4o', instructions='New prompt\n'),
+        ]
+        for asst, name in zip(assistants, 'abc'):
+            asst.name = name
+        client = Mock()
+        client.beta.assistants.list.return_value = assistants
+
+        with patch.object(cli, 'get_client', return_value=client):
+            cli.pull(Namespace(profile=None, jobs=2, include=None, exclude=None))
+
+        assert capsys.readouterr().out.splitlines()[-1] == '1 created, 1 updated, 1 unchanged, 0 failed'
+        assert (tmp_path / 'a.md').stat().st_mtime_ns == mtime
+        assert read_prompt_file(tmp_path / 'renamed.md')['instructions'] == 'Changed prompt\n'
+        assert read_prompt_file(tmp_path / 'c.md')['id'] == 'asst_c'
+
+    def test_pull_after_push_keeps_file(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        write_prompt(tmp_path / 'a.md', {'name': 'a', 'model': 'gpt-4o', 'tools': 'file_search'})
+
+        client = Mock()
+        client.beta.assistants.create.return_value = Mock(id='asst_a')
+        with patch.object(cli, 'get_client', return_value=client):
+            cli.push(push_args())
+        content = (tmp_path / 'a.md').read_text()
+
+        asst = Mock(id='asst_a', model='gpt-4o', instructions='Test prompt')
+        asst.name = 'a'
+        client.beta.assistants.list.return_value = [asst]
+        with patch.object(cli, 'get_client', return_value=client):
+            cli.pull(Namespace(profile=None, jobs=1, include=None, exclude=None))
+
+        assert capsys.readouterr().out.splitlines()[-1] == '0 created, 0 updated, 1 unchanged, 0 failed'
+        assert (tmp_path / 'a.md').read_text() == content
+
+    def test_pull_keeps_include_directives(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'policy.txt').write_text('Be kind.\n')
+        write_prompt(tmp_path / 'a.md', {'id': 'asst_a', 'name': 'a', 'model': 'gpt-4o'},
+                     'A\n<!-- include: policy.txt -->')
+        write_prompt(tmp_path / 'b.md', {'id': 'asst_b', 'name': 'b', 'model': 'gpt-4o'},
+                     'B\n<!-- include: policy.txt -->')
+
+        assistants = [
+            Mock(id='asst_a', model='gpt-4o-mini', instructions='A\nBe kind.\n'),
+            Mock(id='asst_b', model='gpt-4o', instructions='Edited remotely\n'),
+        ]
+        for asst, name in zip(assistants, 'ab'):
+            asst.name = name
+        client = Mock()
+        client.beta.assistants.list.return_value = assistants
+
+        with patch.object(cli, 'get_client', return_value=client):
+            cli.pull(Namespace(profile=None, jobs=1, include=None, exclude=None))
+
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0].startswith('warning b.md: remote instructions differ')
+        assert lines[-1] == '0 created, 1 updated, 1 unchanged, 0 failed'
+        assert read_prompt_file(tmp_path / 'a.md') == {
+            'id': 'asst_a', 'name': 'a', 'model': 'gpt-4o-mini',
+            'instructions': 'A\n<!-- include: policy.txt -->\n',
+        }
+        assert read_prompt_file(tmp_path / 'b.md')['instructions'] == 'B\n<!-- include: policy.txt -->\n'
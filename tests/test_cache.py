@@ -0,0 +1,70 @@
+from unittest.mock import Mock, call
+
+from openai.types.beta.threads import TextContentBlock, Text
+
+from gptman.assistant import run_assistant
+from gptman.assistant.cache import ResponseCache
+
+
+def make_client():
+    client = Mock()
+    client.beta.assistants.retrieve.return_value = Mock(model='gpt-4o', instructions='Prompt', tools=[])
+    message = Mock(role='assistant', attachments=[], content=[
+        TextContentBlock(type='text', text=Text(value='Hello', annotations=[])),
+    ])
+    client.beta.threads.messages.list.return_value = Mock(data=[message], __iter__=lambda _: iter([message]))
+    client.beta.threads.runs.create.return_value = Mock(status='completed')
+    return client
+
+
+class TestResponseCache:
+    def test_get_and_set(self, tmp_path):
+        cache = ResponseCache(tmp_path / 'responses.sqlite')
+        assert cache.get('key') is None
+        cache.set('key', 'value')
+        assert cache.get('key') == 'value'
+        assert cache.stats() == {'hits': 1, 'misses': 1, 'entries': 1, 'size': 5}
+
+    def test_ttl(self, tmp_path):
+        cache = ResponseCache(tmp_path / 'responses.sqlite', ttl=-1)
+        cache.set('key', 'value')
+        assert cache.get('key') is None
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = ResponseCache(tmp_path / 'responses.sqlite', max_size=10)
+        cache.set('a', '12345')
+        cache.set('b', '12345')
+        cache.get('a')
+        cache.set('c', '12345')
+        assert cache.get('b') is None
+        assert cache.get('a') == '12345'
+        assert cache.get('c') == '12345'
+
+    def test_key_depends_on_assistant_config(self, tmp_path):
+        cache = ResponseCache(tmp_path / 'responses.sqlite')
+        client = make_client()
+        key = cache.make_key(client, 'asst_a', [('user', 'Hi', [])])
+
+        assert key == cache.make_key(client, 'asst_a', [('user', 'Hi', [])])
+        assert key != cache.make_key(client, 'asst_a', [('user', 'Bye', [])])
+
+        # A prompt pushed while the cache is open changes the key
+        client.beta.assistants.retrieve.return_value.instructions = 'Changed'
+        assert key != cache.make_key(client, 'asst_a', [('user', 'Hi', [])])
+
+
+def test_run_assistant_uses_cache(tmp_path):
+    cache = ResponseCache(tmp_path / 'responses.sqlite')
+    client = make_client()
+
+    messages = [{'role': 'user', 'content': 'Hi'}]
+
+    for _ in range(2):
+        result = run_assistant(client, 'asst_a', Mock(id='thread_a'), cache=cache, additional_messages=messages)
+        assert result == 'Hello'
+
+    assert client.beta.threads.runs.create.call_count == 1
+    assert client.beta.threads.messages.create.call_args_list == [
+        call(thread_id='thread_a', role='user', content='Hi'),
+        call(thread_id='thread_a', role='assistant', content='Hello'),
+    ]
@@ -0,0 +1,30 @@
+from gptman.assistant.discover import find_prompt_files, is_prompt_file
+
+
+def test_find_prompt_files(tmp_path):
+    for path in ['a.md', 'team/b.md', 'team/drafts/c.md', 'notes.txt', '.gptman/d.md', '.git/e.md']:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text('')
+
+    assert find_prompt_files(tmp_path) == ['a.md']
+    assert find_prompt_files(tmp_path, include=['**/*.md']) == ['a.md', 'team/b.md', 'team/drafts/c.md']
+    assert find_prompt_files(tmp_path, include=['**/*.md'], exclude=['team/drafts/*']) == ['a.md', 'team/b.md']
+    assert find_prompt_files(tmp_path, include=['team/*.md']) == ['team/b.md']
+
+
+def test_is_prompt_file():
+    assert is_prompt_file('a.md')
+    assert not is_prompt_file('x/y/a.md')
+    assert is_prompt_file('x/y/a.md', include=['**/*.md'])
+    assert not is_prompt_file('README.md', exclude=['README.md'])
+    assert is_prompt_file('docs/README.md', include=['**/*.md'], exclude=['README.md'])
+    assert not is_prompt_file('docs/README.md', include=['**/*.md'], exclude=['**/README.md'])
+    assert not is_prompt_file('.hidden/a.md', include=['**/*.md'])
+    assert is_prompt_file('a.prompt', include=['*.prompt'])
+
+
+def test_double_star():
+    assert is_prompt_file('team/a.md', include=['team/**/*.md'])
+    assert is_prompt_file('team/x/y/a.md', include=['team/**/*.md'])
+    assert not is_prompt_file('other/a.md', include=['team/**/*.md'])
+    assert not is_prompt_file('team/x/a.md', include=['team/*.md'])
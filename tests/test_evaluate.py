@@ -0,0 +1,81 @@
+import json
+from argparse import Namespace
+from unittest.mock import Mock, patch
+
+from openai.types.beta.threads import TextContentBlock, Text
+
+from gptman.assistant import cli
+from gptman.assistant.evaluate import read_cases, read_finished, run_case
+
+
+def make_client(status='completed'):
+    client = Mock()
+    client.beta.threads.create_and_run.return_value = Mock(
+        status=status,
+        last_error=None,
+        usage=Mock(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+    )
+    client.beta.threads.messages.list.return_value = Mock(data=[
+        Mock(role='assistant', content=[TextContentBlock(type='text', text=Text(value='Hello', annotations=[]))]),
+    ])
+    return client
+
+
+def test_read_cases(tmp_path):
+    jsonl = tmp_path / 'cases.jsonl'
+    jsonl.write_text('{"id": "a", "input": "Hi"}\n\n{"input": "Bye"}\n')
+    assert list(read_cases(jsonl)) == [
+        {'id': 'a', 'input': 'Hi'},
+        {'id': '2', 'input': 'Bye'},
+    ]
+
+    csv = tmp_path / 'cases.csv'
+    csv.write_text('id,input\na,Hi\n')
+    assert list(read_cases(csv)) == [{'id': 'a', 'input': 'Hi'}]
+
+
+def test_read_finished(tmp_path):
+    output = tmp_path / 'results.jsonl'
+    assert read_finished(output) == set()
+
+    output.write_text(
+        '{"id": "a", "assistant_id": "asst_a", "status": "completed"}\n'
+        '{"id": "b", "assistant_id": "asst_a", "status": "failed"}\n'
+        '{"id": "c", "assistant_id"'
+    )
+    assert read_finished(output) == {('a', 'asst_a')}
+
+
+class TestRunCase:
+    def test_completed(self):
+        result = run_case(make_client(), 'asst_a', {'id': 'a', 'input': 'Hi'})
+        assert result['status'] == 'completed'
+        assert result['output'] == 'Hello'
+        assert result['usage'] == {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15}
+
+    def test_failed(self):
+        result = run_case(make_client('failed'), 'asst_a', {'id': 'a', 'input': 'Hi'})
+        assert result['status'] == 'failed'
+        assert result['output'] is None
+        assert result['usage']['total_tokens'] == 15
+
+
+def test_evaluate_resumes(tmp_path, capsys):
+    dataset = tmp_path / 'cases.jsonl'
+    dataset.write_text(''.join(
+        json.dumps({'id': str(idx), 'input': f'Input {idx}'}) + '\n'
+        for idx in range(5)
+    ))
+    output = tmp_path / 'results.jsonl'
+    output.write_text('{"id": "0", "assistant_id": "asst_a", "status": "completed"}\n')
+    client = make_client()
+
+    args = Namespace(dataset=str(dataset), assistant=['asst_a'], output=str(output), jobs=3, profile=None, cache=False)
+    with patch.object(cli, 'get_client', return_value=client), \
+            patch.object(cli, 'get_profile_settings', return_value={}):
+        cli.evaluate(args)
+
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [result['id'] for result in results] == ['0', '1', '2', '3', '4']
+    assert client.beta.threads.create_and_run.call_count == 4
+    assert capsys.readouterr().out.splitlines()[-1] == '4 completed (1 skipped, 60 tokens)'
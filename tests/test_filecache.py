@@ -0,0 +1,74 @@
+from unittest.mock import Mock
+
+import pytest
+
+from gptman.assistant.filecache import FileCache
+
+
+def make_file(file_id, created_at, filename=None, purpose='assistants'):
+    return Mock(id=file_id, filename=filename or f'{file_id}.txt', purpose=purpose,
+                bytes=10, created_at=created_at, status='processed')
+
+
+class TestFileCache:
+    def test_incremental_sync(self, tmp_path):
+        cache = FileCache(tmp_path / 'files.sqlite')
+        client = Mock()
+        client.files.list.return_value = [make_file('file_b', 200), make_file('file_a', 100)]
+        assert cache.sync(client) == 2
+        client.files.list.assert_called_with(order='desc', limit=10000)
+
+        fetched = []
+
+        def list_files(**kwargs):
+            for file_obj in [make_file('file_c', 300), make_file('file_b', 200), make_file('file_a', 100)]:
+                fetched.append(file_obj.id)
+                yield file_obj
+
+        client.files.list.side_effect = list_files
+        assert cache.sync(client) == 2
+        assert fetched == ['file_c', 'file_b', 'file_a']
+        client.files.list.assert_called_with(order='desc', limit=100)
+        assert [f.id for f in cache.search()] == ['file_c', 'file_b', 'file_a']
+
+    def test_interrupted_sync_is_repeated(self, tmp_path):
+        cache = FileCache(tmp_path / 'files.sqlite')
+        client = Mock()
+
+        def interrupted(**kwargs):
+            yield make_file('file_b', 200)
+            raise ConnectionError()
+
+        client.files.list.side_effect = interrupted
+        with pytest.raises(ConnectionError):
+            cache.sync(client)
+
+        client.files.list.side_effect = None
+        client.files.list.return_value = [make_file('file_b', 200), make_file('file_a', 100)]
+        assert cache.sync(client) == 2
+        assert [f.id for f in cache.search()] == ['file_b', 'file_a']
+
+    def test_refresh_drops_deleted_files(self, tmp_path):
+        cache = FileCache(tmp_path / 'files.sqlite')
+        client = Mock()
+        client.files.list.return_value = [make_file('file_b', 200), make_file('file_a', 100)]
+        cache.sync(client)
+
+        client.files.list.return_value = [make_file('file_a', 100)]
+        cache.sync(client, refresh=True)
+        client.files.list.assert_called_with(order='desc', limit=10000)
+        assert [f.id for f in cache.search()] == ['file_a']
+
+    def test_search(self, tmp_path):
+        cache = FileCache(tmp_path / 'files.sqlite')
+        cache.put(make_file('file_a', 100, 'report_2024.pdf'))
+        cache.put(make_file('file_b', 200, 'report.pdf', purpose='vision'))
+        cache.put(make_file('file_c', 300, 'notes.md'))
+
+        assert [f.id for f in cache.search(name='report')] == ['file_b', 'file_a']
+        assert [f.id for f in cache.search(name='report_')] == ['file_a']
+        assert [f.id for f in cache.search(purpose='vision')] == ['file_b']
+        assert cache.get('file_c').filename == 'notes.md'
+
+        cache.remove('file_c')
+        assert cache.get('file_c') is None
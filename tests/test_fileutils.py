@@ -0,0 +1,34 @@
+import os
+
+from gptman.fileutils import atomic_write, read_json_state, write_if_changed
+
+
+def test_atomic_write_keeps_mode(tmp_path):
+    path = tmp_path / 'prompt.md'
+    path.write_text('old')
+    os.chmod(path, 0o600)
+
+    atomic_write(path, 'new')
+
+    assert path.read_text() == 'new'
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert os.listdir(tmp_path) == ['prompt.md']
+
+
+def test_write_if_changed(tmp_path):
+    path = tmp_path / 'prompt.md'
+    assert write_if_changed(path, 'text') == 'create'
+    assert write_if_changed(path, 'text') == 'unchanged'
+    assert write_if_changed(path, 'other') == 'update'
+    assert path.read_text() == 'other'
+
+
+def test_read_json_state(tmp_path):
+    path = tmp_path / 'state.json'
+    assert read_json_state(path, {}) == {}
+
+    path.write_text('{"a": 1}')
+    assert read_json_state(path, {}) == {'a': 1}
+
+    path.write_text('{"a": ')
+    assert read_json_state(path, {}) == {}
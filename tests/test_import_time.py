@@ -0,0 +1,32 @@
+import sys
+import subprocess
+
+
+# Generous for slow CI machines, importing openai alone takes longer
+IMPORT_TIME_BUDGET = 0.25
+
+
+def import_cli(*options):
+    return subprocess.run(
+        [sys.executable, *options, '-c', 'import sys, gptman.cli; print(" ".join(sys.modules))'],
+        capture_output=True, text=True, check=True,
+    )
+
+
+def test_cli_does_not_import_heavy_modules():
+    modules = import_cli().stdout.split()
+    for heavy in ['openai', 'tabulate', 'gptman.assistant.shell', 'sqlite3']:
+        assert heavy not in modules
+
+
+def test_cli_import_time():
+    result = import_cli('-X', 'importtime')
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, us, name = line.split('|')
+            if us.strip().isdigit():
+                cumulative[name.strip()] = int(us) / 1e6
+
+    assert cumulative['gptman.cli'] < IMPORT_TIME_BUDGET
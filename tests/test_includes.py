@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from unittest.mock import patch
+
+from gptman import exceptions as exc
+from gptman.assistant import includes
+from gptman.assistant.includes import PromptBuild, read_resolved_prompt_file
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+@pytest.fixture
+def prompts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write(tmp_path / 'shared/policy.md', 'Be polite.\n<!-- include: format.md -->\n')
+    write(tmp_path / 'shared/format.md', 'Answer in Markdown.\n')
+    write(tmp_path / 'a.md', '---\nname: a\n---\nYou are A.\n<!-- include: shared/policy.md -->\n')
+    write(tmp_path / 'b.md', '---\nname: b\n---\nYou are B.\n<!-- include: shared/format.md -->\n')
+    write(tmp_path / 'c.md', '---\nname: c\n---\nYou are C.\n')
+    return tmp_path
+
+
+def touch(path, text):
+    path.write_text(text)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+
+def test_resolve_transitive_includes(prompts):
+    data, stamps = read_resolved_prompt_file('a.md')
+
+    assert data['instructions'] == 'You are A.\nBe polite.\nAnswer in Markdown.\n'
+    assert set(stamps) == {'a.md', 'shared/policy.md', 'shared/format.md'}
+
+
+def test_include_errors(prompts):
+    write(prompts / 'missing.md', '---\nname: m\n---\n<!-- include: nowhere.md -->\n')
+    with pytest.raises(exc.IncludeError):
+        read_resolved_prompt_file('missing.md')
+
+    write(prompts / 'shared/loop.md', '<!-- include: ../cycle.md -->\n')
+    write(prompts / 'cycle.md', '---\nname: cycle\n---\n<!-- include: shared/loop.md -->\n')
+    with pytest.raises(exc.IncludeError):
+        read_resolved_prompt_file('cycle.md')
+
+
+class TestPromptBuild:
+    def test_fragments_are_not_prompts(self, prompts):
+        build = PromptBuild()
+        paths = ['a.md', 'b.md', 'c.md', 'shared/format.md', 'shared/policy.md']
+
+        assert build.find_prompts(paths) == ['a.md', 'b.md', 'c.md']
+
+    def test_change_of_fragment_affects_dependents_only(self, prompts):
+        build = PromptBuild()
+        build.find_prompts(['a.md', 'b.md', 'c.md'])
+        build.save()
+
+        assert build.dependents(['shared/format.md']) == ['a.md', 'b.md']
+        assert build.dependents(['shared/policy.md']) == ['a.md']
+
+    def test_cached_between_runs(self, prompts):
+        build = PromptBuild()
+        build.read('a.md')
+        build.save()
+
+        build = PromptBuild()
+        touch(prompts / 'shared/format.md', 'Answer in plain text.\n')
+
+        with patch.object(includes, 'read_resolved_prompt_file', wraps=read_resolved_prompt_file) as read:
+            assert build.read('c.md')['instructions'] == 'You are C.\n'
+            assert build.read('a.md')['instructions'] == 'You are A.\nBe polite.\nAnswer in plain text.\n'
+
+        # c.md is new to the cache, a.md includes the changed file
+        assert [call.args[0] for call in read.call_args_list] == ['c.md', 'a.md']
+        with patch.object(includes, 'read_resolved_prompt_file', wraps=read_resolved_prompt_file) as read:
+            build.read('a.md')
+        read.assert_not_called()
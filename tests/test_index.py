@@ -0,0 +1,27 @@
+from unittest.mock import patch
+
+from gptman.assistant import index
+from gptman.assistant.index import PromptIndex
+
+
+def test_prompt_index(tmp_path):
+    a = tmp_path / 'a.md'
+    b = tmp_path / 'b.md'
+    a.write_text('---\nid: asst_a\n---\nPrompt A\n')
+    b.write_text('no preamble\n')
+    index_path = tmp_path / '.gptman' / 'index.json'
+
+    prompt_index = PromptIndex(index_path)
+    assert prompt_index.id_to_filename([a, b]) == {'asst_a': a}
+    prompt_index.save([a, b])
+
+    prompt_index = PromptIndex(index_path)
+    with patch.object(index, 'read_preamble') as read_preamble:
+        assert prompt_index.lookup(a) == 'asst_a'
+        read_preamble.assert_not_called()
+
+    a.write_text('---\nid: asst_changed\n---\nPrompt A\n')
+    assert prompt_index.lookup(a) == 'asst_changed'
+
+    prompt_index.save([a])
+    assert list(PromptIndex(index_path).entries) == [str(a)]
@@ -0,0 +1,72 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from gptman.instrument import Recorder, normalize_endpoint
+
+
+def make_exchange(recorder, method, path, status, retry=0):
+    request = SimpleNamespace(
+        method=method,
+        url=SimpleNamespace(path=path),
+        headers={'x-stainless-retry-count': str(retry)},
+        extensions={},
+    )
+    recorder.on_request(request)
+    recorder.on_response(SimpleNamespace(request=request, status_code=status))
+
+
+def test_normalize_endpoint():
+    assert normalize_endpoint('/v1/threads/thread_abc123/runs/run_abc123') == '/threads/{id}/runs/{id}'
+    assert normalize_endpoint('/v1/assistants') == '/assistants'
+    assert normalize_endpoint('/openai/assistants/asst_abc') == '/openai/assistants/{id}'
+    assert normalize_endpoint('/v1/files/file-AbC123') == '/files/{id}'
+    assert normalize_endpoint('/v1/vector_stores/vs_a/file_batches/vsfb_1/files') == \
+        '/vector_stores/{id}/file_batches/{id}/files'
+
+
+class TestRecorder:
+    def test_summarize(self):
+        recorder = Recorder()
+        make_exchange(recorder, 'POST', '/v1/assistants/asst_a', 429)
+        make_exchange(recorder, 'POST', '/v1/assistants/asst_a', 200, retry=1)
+        make_exchange(recorder, 'GET', '/v1/assistants', 200)
+
+        rows = recorder.summarize()
+        assert [(row['method'], row['endpoint'], row['calls'], row['errors'], row['retries']) for row in rows] == [
+            ('GET', '/assistants', 1, 0, 0),
+            ('POST', '/assistants/{id}', 2, 1, 1),
+        ]
+
+    def test_record_run(self):
+        recorder = Recorder()
+        recorder.record_run(Mock(id='run_a', assistant_id='asst_a', status='completed',
+                                 usage=Mock(prompt_tokens=10, completion_tokens=3)))
+        recorder.record_run(Mock(id='run_b', assistant_id='asst_a', status='failed', usage=None))
+
+        assert '2 runs, 10 prompt tokens, 3 completion tokens' in recorder.format_summary()
+
+    def test_write_trace(self, tmp_path):
+        recorder = Recorder()
+        make_exchange(recorder, 'GET', '/v1/files', 200)
+        recorder.record_run(Mock(id='run_a', assistant_id='asst_a', status='completed',
+                                 usage=Mock(prompt_tokens=10, completion_tokens=3)))
+
+        recorder.write_trace(tmp_path / 'trace.jsonl')
+
+        lines = [json.loads(line) for line in (tmp_path / 'trace.jsonl').read_text().splitlines()]
+        assert [line['type'] for line in lines] == ['call', 'run']
+        assert lines[0]['endpoint'] == '/files'
+        assert lines[1]['prompt_tokens'] == 10
+
+    def test_write_metrics(self, tmp_path):
+        recorder = Recorder()
+        make_exchange(recorder, 'GET', '/v1/files', 200)
+        make_exchange(recorder, 'GET', '/v1/files', 429)
+
+        recorder.write_metrics(tmp_path / 'gptman.prom')
+
+        text = (tmp_path / 'gptman.prom').read_text()
+        assert 'gptman_api_requests_total{method="GET",endpoint="/files",status="200"} 1' in text
+        assert 'gptman_api_requests_total{method="GET",endpoint="/files",status="429"} 1' in text
+        assert 'gptman_run_tokens_total{type="prompt"} 0' in text
@@ -1,10 +1,17 @@
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
+
+import openai
+
+from openai.types.beta.threads import TextContentBlock, Text
+
 from gptman.main import (
     get_client,
+    read_settings,
 )
 from gptman.assistant import (
     update_instruction,
     list_assistants,
+    send_message,
 )
 
 
@@ -29,6 +36,15 @@ class TestGetClient:
         }
         assert get_client(settings, profile='profile_a')
 
+    def test_openai_client_with_base_url(self):
+        settings = {
+            'gptman': {
+                'api_key': 'fake-api-key',
+                'base_url': 'http://127.0.0.1:8000/v1',
+            }
+        }
+        assert str(get_client(settings).base_url) == 'http://127.0.0.1:8000/v1/'
+
     def test_azure_client(self):
         settings = {
             'gptman': {
@@ -53,6 +69,51 @@ class TestGetClient:
         }
         assert get_client(settings, profile='profile_a')
 
+    def test_client_is_cached_per_profile(self):
+        settings = {
+            'gptman': {'backend': 'openai', 'api_key': 'fake-api-key'},
+            'profile': {
+                'profile_a': {'backend': 'openai', 'api_key': 'other-api-key'},
+            },
+        }
+        client = get_client(settings)
+        assert get_client(settings) is client
+        assert get_client(settings, profile='profile_a') is not client
+        assert get_client(settings, async_=True) is not client
+
+    def test_http_settings(self):
+        settings = {
+            'gptman': {
+                'backend': 'openai',
+                'api_key': 'fake-api-key',
+                'http': {'max_retries': 5},
+            }
+        }
+        assert get_client(settings).max_retries == 5
+
+    def test_http_limits(self):
+        settings = {
+            'gptman': {
+                'backend': 'openai',
+                'api_key': 'fake-api-key',
+                'http': {'timeout': 30, 'max_connections': 10},
+            }
+        }
+        with patch.object(openai, 'DefaultHttpxClient', wraps=openai.DefaultHttpxClient) as http_client_class:
+            client = get_client(settings)
+        assert client.timeout == openai.Timeout(30, connect=5)
+        limits = http_client_class.call_args.kwargs['limits']
+        assert (limits.max_connections, limits.max_keepalive_connections) == (10, 100)
+
+
+def test_read_settings_is_cached(tmp_path):
+    path = tmp_path / 'gptman.toml'
+    path.write_text('[gptman]\napi_key = "fake-api-key"\n')
+
+    settings = read_settings([str(path)])
+    assert settings == {'gptman': {'api_key': 'fake-api-key'}}
+    assert read_settings([str(path)]) is settings
+
 
 class TestUpdateInstruction:
     def test_update(self):
@@ -71,3 +132,25 @@ class TestUpdateInstruction:
             'test_asst',
             tools=[{'type': 'file_search'}]
         )
+
+
+class TestSendMessage:
+    def test_message_is_added_by_run(self):
+        client = Mock()
+        client.beta.threads.runs.create.return_value = Mock(id='run_a', thread_id='thread_a', status='completed')
+        client.beta.threads.messages.list.return_value = Mock(data=[
+            Mock(role='assistant', content=[TextContentBlock(type='text', text=Text(value='Second', annotations=[]))]),
+            Mock(role='assistant', content=[TextContentBlock(type='text', text=Text(value='First', annotations=[]))]),
+        ])
+
+        result = send_message(client, 'asst_a', Mock(id='thread_a'), 'Hi')
+
+        assert result == 'First\n\nSecond'
+        client.beta.threads.messages.create.assert_not_called()
+        client.beta.threads.runs.create.assert_called_with(
+            thread_id='thread_a',
+            assistant_id='asst_a',
+            additional_messages=[{'role': 'user', 'content': 'Hi'}],
+        )
+        client.beta.threads.messages.list.assert_called_with(
+            thread_id='thread_a', run_id='run_a', order='desc', limit=20)
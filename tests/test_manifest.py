@@ -0,0 +1,33 @@
+from gptman.assistant.manifest import (
+    prompt_digest,
+    read_manifest,
+    write_manifest,
+    record_push,
+    is_unchanged,
+)
+
+
+class TestPromptDigest:
+    def test_ignores_id_and_trailing_whitespace(self):
+        data = {'name': 'a', 'instructions': 'Test prompt\n'}
+        assert prompt_digest(data) == prompt_digest({
+            'id': 'asst_a', 'name': 'a', 'instructions': 'Test prompt\n\n',
+        })
+
+    def test_changes_with_content(self):
+        data = {'name': 'a', 'instructions': 'Test prompt\n'}
+        assert prompt_digest(data) != prompt_digest({**data, 'model': 'gpt-4o'})
+
+
+def test_manifest_round_trip(tmp_path):
+    path = tmp_path / '.gptman' / 'state.json'
+    manifest = read_manifest(path)
+    assert manifest == {'assistants': {}}
+
+    record_push(manifest, 'asst_a', 'digest-a', 'a.md')
+    write_manifest(manifest, path)
+
+    manifest = read_manifest(path)
+    assert is_unchanged(manifest, 'asst_a', 'digest-a')
+    assert not is_unchanged(manifest, 'asst_a', 'digest-b')
+    assert not is_unchanged(manifest, 'asst_b', 'digest-a')
@@ -0,0 +1,47 @@
+import os
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from gptman.assistant.multipart import upload_large_file
+
+
+def make_client(fail_parts=()):
+    client = Mock()
+    client.uploads.create.return_value = Mock(id='upload_a', expires_at=time.time() + 3600)
+    received = {}
+
+    def create_part(upload_id, data):
+        if data in fail_parts:
+            raise ConnectionError('dropped')
+        part_id = f'part_{data.decode()}'
+        received[part_id] = data
+        return Mock(id=part_id)
+
+    client.uploads.parts.create.side_effect = create_part
+    client.uploads.complete.return_value = Mock(file=Mock(id='file_a'))
+    return client, received
+
+
+def test_upload_resumes_from_journal(tmp_path):
+    path = tmp_path / 'large.pdf'
+    path.write_bytes(b'aabbccd')
+    journal_dir = tmp_path / 'journal'
+    kwargs = {'part_size': 2, 'jobs': 2, 'journal_dir': journal_dir, 'on_progress': Mock()}
+
+    client, received = make_client(fail_parts=[b'cc'])
+    with pytest.raises(ConnectionError):
+        upload_large_file(client, path, **kwargs)
+    assert sorted(received) == ['part_aa', 'part_bb', 'part_d']
+    assert len(os.listdir(journal_dir)) == 1
+
+    client, received = make_client()
+    client.uploads.create.side_effect = AssertionError('upload should be resumed')
+    file_obj = upload_large_file(client, path, **kwargs)
+
+    assert file_obj.id == 'file_a'
+    assert list(received) == ['part_cc']
+    client.uploads.complete.assert_called_with(
+        'upload_a', part_ids=['part_aa', 'part_bb', 'part_cc', 'part_d'])
+    assert os.listdir(journal_dir) == []
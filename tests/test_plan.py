@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from gptman.assistant.plan import diff_prompt, format_changes
+
+
+def make_assistant(**kwargs):
+    return SimpleNamespace(**{'tools': [], **kwargs})
+
+
+class TestDiffPrompt:
+    def test_no_changes(self):
+        asst = make_assistant(id='asst_a', name='a', instructions='Test prompt')
+        data = {'id': 'asst_a', 'name': 'a', 'instructions': 'Test prompt\n\n'}
+        assert diff_prompt(data, asst) == {}
+
+    def test_changed_fields(self):
+        asst = make_assistant(name='a', model='gpt-4o', instructions='Old prompt')
+        data = {'name': 'a', 'model': 'gpt-4o-mini', 'instructions': 'New prompt\n'}
+        assert diff_prompt(data, asst) == {
+            'model': ('gpt-4o', 'gpt-4o-mini'),
+            'instructions': ('Old prompt', 'New prompt\n'),
+        }
+
+    def test_tools_order_does_not_matter(self):
+        asst = make_assistant(tools=[Mock(type='file_search'), Mock(type='code_interpreter')])
+        assert diff_prompt({'tools': 'code_interpreter file_search'}, asst) == {}
+        assert diff_prompt({'tools': 'file_search'}, asst) == {
+            'tools': ('file_search code_interpreter', 'file_search'),
+        }
+
+
+def test_format_changes():
+    text = format_changes({
+        'model': ('gpt-4o', 'gpt-4o-mini'),
+        'instructions': ('Old prompt', 'New prompt'),
+    })
+    assert "  model: 'gpt-4o' -> 'gpt-4o-mini'" in text
+    assert '    -Old prompt' in text
+    assert '    +New prompt' in text
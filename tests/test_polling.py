@@ -0,0 +1,67 @@
+from unittest.mock import Mock
+
+import pytest
+
+from gptman import exceptions as exc
+from gptman.assistant.polling import PollingPolicy, poll_run
+
+
+def make_run(status, **kwargs):
+    return Mock(id='run_a', thread_id='thread_a', status=status, **kwargs)
+
+
+class TestPollingPolicy:
+    def test_intervals_back_off(self):
+        policy = PollingPolicy(initial_interval=1, max_interval=4, jitter=0)
+        intervals = policy.intervals()
+        assert [next(intervals) for _ in range(5)] == [1, 2, 4, 4, 4]
+
+    def test_jitter(self):
+        policy = PollingPolicy(initial_interval=1, jitter=0.5)
+        intervals = policy.intervals()
+        assert 0.5 <= next(intervals) <= 1.5
+
+    def test_from_settings(self):
+        policy = PollingPolicy.from_settings({'polling': {'timeout': 300}})
+        assert policy.timeout == 300
+        assert PollingPolicy.from_settings({}).timeout == 60
+
+
+class TestPollRun:
+    def test_completed(self):
+        client = Mock()
+        client.beta.threads.runs.retrieve.side_effect = [
+            make_run('in_progress'),
+            make_run('completed'),
+        ]
+
+        run_obj = poll_run(client, make_run('queued'), sleep=Mock())
+
+        assert run_obj.status == 'completed'
+        client.beta.threads.runs.retrieve.assert_called_with('run_a', thread_id='thread_a')
+
+    @pytest.mark.parametrize('status', ['failed', 'cancelled', 'expired', 'incomplete'])
+    def test_failed(self, status):
+        client = Mock()
+        client.beta.threads.runs.retrieve.return_value = make_run(status)
+
+        with pytest.raises(exc.RunFailed):
+            poll_run(client, make_run('queued'), sleep=Mock())
+
+    def test_timeout_cancels_run(self):
+        client = Mock()
+        client.beta.threads.runs.retrieve.return_value = make_run('in_progress')
+        policy = PollingPolicy(initial_interval=0.001, timeout=0.01)
+
+        with pytest.raises(exc.RequestTimeout):
+            poll_run(client, make_run('queued'), policy)
+
+        client.beta.threads.runs.cancel.assert_called_with('run_a', thread_id='thread_a')
+
+    def test_interrupt_cancels_run(self):
+        client = Mock()
+
+        with pytest.raises(KeyboardInterrupt):
+            poll_run(client, make_run('queued'), sleep=Mock(side_effect=KeyboardInterrupt))
+
+        client.beta.threads.runs.cancel.assert_called_with('run_a', thread_id='thread_a')
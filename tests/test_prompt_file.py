@@ -4,6 +4,7 @@ import pytest
 from gptman import exceptions as exc
 from gptman.assistant.prompt import (
     read_prompt_file,
+    read_preamble,
     parse_markdown_with_preamble,
 )
 from gptman.main import read_settings
@@ -20,6 +21,20 @@ def test_read_prompt_file():
     }
 
 
+def test_read_preamble():
+    assert read_preamble('tests/fixture/test_prompt.md') == {
+        'id': 'test-file-id',
+    }
+
+
+def test_read_preamble_without_close_preamble(tmp_path):
+    path = tmp_path / 'prompt.md'
+    path.write_text('---\nid: test-id\n')
+
+    with pytest.raises(exc.PreambleNotFound):
+        read_preamble(path)
+
+
 class TestParseMarkdownWithPreamble:
     def test_with_preamble(self):
         text = '''---
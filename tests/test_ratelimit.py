@@ -0,0 +1,159 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from gptman.ratelimit import RateLimiter, TokenBucket, parse_duration, estimate_tokens
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_duration():
+    assert parse_duration('1s') == 1
+    assert parse_duration('20ms') == 0.02
+    assert parse_duration('6m0s') == 360
+    assert parse_duration('1h2m3.5s') == 3723.5
+    assert parse_duration('') is None
+    assert parse_duration('soon') is None
+
+
+def test_estimate_tokens():
+    def request(method, path, content=b''):
+        return SimpleNamespace(method=method, url=SimpleNamespace(path=path), content=content)
+
+    assert estimate_tokens(request('POST', '/v1/threads/thread_a/runs', b'x' * 400)) == 100
+    assert estimate_tokens(request('POST', '/v1/assistants', b'x' * 400)) == 0
+    assert estimate_tokens(request('GET', '/v1/threads/thread_a/runs')) == 0
+
+
+class TestTokenBucket:
+    def test_unlimited_without_rate(self):
+        bucket = TokenBucket(clock=FakeClock())
+        assert bucket.wait_time(10 ** 9) == 0
+
+    def test_wait_and_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock)
+
+        bucket.take(60)
+        assert bucket.wait_time(1) == 1
+
+        clock.now += 1
+        assert bucket.wait_time(1) == 0
+
+    def test_learn_limit_from_headers(self):
+        clock = FakeClock()
+        bucket = TokenBucket(clock=clock)
+
+        bucket.update(limit=120, remaining=0, reset=2)
+
+        assert bucket.per_minute == 120
+        assert bucket.wait_time(1) == 2
+
+    def test_configured_limit_is_kept(self):
+        bucket = TokenBucket(60, clock=FakeClock())
+        bucket.update(limit=1000, remaining=10)
+        assert bucket.per_minute == 60
+        assert bucket.available == 10
+
+
+class TestRateLimiter:
+    def test_pause_on_429(self):
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock)
+
+        limiter.update(429, {'retry-after-ms': '1500'})
+
+        assert limiter.wait_time(0) == 1.5
+        clock.now += 1.5
+        assert limiter.wait_time(0) == 0
+
+    def test_token_budget(self):
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=100, tokens_per_minute=600, clock=clock)
+
+        limiter.acquire(600)
+
+        assert limiter.wait_time(60) == 6
+
+    def test_requests_are_served_in_order(self):
+        limiter = RateLimiter(requests_per_minute=600)
+        limiter.requests.take(600)
+        order = []
+
+        def worker(i):
+            limiter.acquire()
+            order.append(i)
+
+        threads = []
+        for i in range(3):
+            thread = threading.Thread(target=worker, args=(i,))
+            thread.start()
+            threads.append(thread)
+            # Wait until the worker is queued
+            while len(limiter.queue) <= i:
+                pass
+        for thread in threads:
+            thread.join()
+
+        assert order == [0, 1, 2]
+
+    def test_async_requests_are_served_in_order(self):
+        limiter = RateLimiter(requests_per_minute=600)
+        limiter.requests.take(600)
+        order = []
+
+        async def worker(i):
+            await limiter.acquire_async()
+            order.append(i)
+
+        async def main():
+            threads = threading.active_count()
+            tasks = []
+            for i in range(3):
+                tasks.append(asyncio.create_task(worker(i)))
+                await asyncio.sleep(0)
+            # Waiting requests hold no threads
+            assert threading.active_count() == threads
+            await asyncio.gather(*tasks)
+
+        asyncio.run(main())
+        assert order == [0, 1, 2]
+
+    def test_cancelled_async_request_takes_no_budget(self):
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=60, clock=clock)
+        limiter.requests.take(60)
+
+        async def main():
+            task = asyncio.create_task(limiter.acquire_async())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(main())
+        assert len(limiter.queue) == 0
+        assert limiter.requests.available == 0
+
+    def test_async_request_is_woken_by_update(self):
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock)
+        limiter.update(429, {'retry-after': '60'})
+
+        async def main():
+            task = asyncio.create_task(limiter.acquire_async())
+            await asyncio.sleep(0.01)
+            clock.now += 60
+            # A response on another thread wakes the request
+            await asyncio.to_thread(limiter.update, 200, {})
+            await asyncio.wait_for(task, 1)
+
+        asyncio.run(main())
+
+    def test_disabled(self):
+        assert RateLimiter.from_settings({'ratelimit': {'enabled': False}}).event_hooks() == {}
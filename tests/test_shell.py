@@ -0,0 +1,85 @@
+import os
+import time
+import signal
+import threading
+
+from unittest.mock import MagicMock, Mock
+
+from openai.types.beta.threads import TextContentBlock, Text
+
+from gptman.assistant.filecache import FileCache
+from gptman.assistant.polling import PollingPolicy
+from gptman.assistant.shell import AssistantShell
+
+
+def make_client(text):
+    client = MagicMock()
+    client.beta.threads.runs.create.return_value = Mock(status='completed')
+    client.beta.threads.messages.list.return_value = Mock(data=[
+        Mock(role='assistant', content=[TextContentBlock(type='text', text=Text(value=text, annotations=[]))]),
+    ])
+    return client
+
+
+class TestAssistantShell:
+    def test_broadcast(self, capsys):
+        client = make_client('Hello')
+        shell = AssistantShell(client, None)
+        shell.onecmd('/assistant asst_a asst_b')
+        shell.onecmd('/mode broadcast')
+
+        shell.onecmd('Hi')
+
+        out = capsys.readouterr().out
+        assert 'asst_a (' in out and 'asst_b (' in out
+        assert out.count('Hello') == 2
+        assert {
+            call.kwargs['assistant_id']
+            for call in client.beta.threads.runs.create.call_args_list
+        } == {'asst_a', 'asst_b'}
+        # One thread for the shell and one for each assistant
+        assert client.beta.threads.create.call_count == 3
+
+        shell.onecmd('Hi again')
+        assert client.beta.threads.create.call_count == 3
+
+    def test_broadcast_interrupted(self, capsys):
+        client = make_client('Hello')
+        client.beta.threads.runs.create.return_value = Mock(status='queued')
+        client.beta.threads.runs.retrieve.return_value = Mock(status='in_progress')
+        shell = AssistantShell(client, None, policy=PollingPolicy(initial_interval=30, timeout=60))
+        shell.onecmd('/assistant asst_a asst_b')
+        shell.onecmd('/mode broadcast')
+
+        threading.Timer(0.2, os.kill, [os.getpid(), signal.SIGINT]).start()
+        started_at = time.monotonic()
+        shell.onecmd('Hi')
+
+        assert time.monotonic() - started_at < 5
+        assert 'Runs are cancelled.' in capsys.readouterr().out
+        assert client.beta.threads.runs.cancel.call_count == 2
+        # Threads busy with the cancelled runs are replaced
+        assert shell.broadcast_threads == {}
+
+    def test_unknown_mode(self, capsys):
+        shell = AssistantShell(make_client('Hello'), 'asst_a')
+        shell.onecmd('/mode parallel')
+        assert shell.mode == 'chain'
+
+    def test_file_status_retrieves_unfinished_files(self, tmp_path, capsys):
+        shell = AssistantShell(make_client('Hello'), 'asst_a')
+        shell._file_cache = FileCache(tmp_path / 'files.sqlite')
+        shell._file_cache.put(Mock(id='file_a', filename='a.txt', purpose='assistants', bytes=1,
+                                   created_at=100, status='processed'))
+        shell._file_cache.put(Mock(id='file_b', filename='b.txt', purpose='assistants', bytes=1,
+                                   created_at=100, status='uploaded'))
+        shell.client.files.retrieve.return_value = Mock(
+            id='file_b', filename='b.txt', purpose='assistants', bytes=1, created_at=100, status='processed')
+
+        shell.onecmd('/file status file_a file_b')
+
+        shell.client.files.retrieve.assert_called_once_with('file_b')
+        assert capsys.readouterr().out.splitlines() == [
+            'a.txt [file_a, processed]',
+            'b.txt [file_b, processed]',
+        ]
@@ -0,0 +1,39 @@
+from unittest.mock import Mock, MagicMock
+
+from openai.types.beta.threads import TextContentBlock, Text
+
+from gptman.assistant import stream_assistant, send_message
+
+
+def make_client(deltas, text):
+    client = MagicMock()
+    stream = client.beta.threads.runs.stream.return_value.__enter__.return_value
+    stream.text_deltas = deltas
+    stream.get_final_run.return_value = Mock(status='completed')
+    stream.get_final_messages.return_value = [
+        Mock(role='assistant', content=[
+            TextContentBlock(type='text', text=Text(value=text, annotations=[])),
+        ]),
+    ]
+    return client
+
+
+class TestStreamAssistant:
+    def test_stream_assistant(self):
+        client = make_client(['Hel', 'lo'], 'Hello')
+        received = []
+
+        result = stream_assistant(client, 'asst_a', Mock(id='thread_a'), on_text=received.append)
+
+        assert result == 'Hello'
+        assert received == ['Hel', 'lo']
+        client.beta.threads.runs.stream.assert_called_with(
+            thread_id='thread_a', assistant_id='asst_a')
+
+    def test_send_message_prints_deltas(self, capsys):
+        client = make_client(['Hel', 'lo'], 'Hello')
+
+        result = send_message(client, 'asst_a', Mock(id='thread_a'), 'Hi', stream=True)
+
+        assert result == 'Hello'
+        assert capsys.readouterr().out == 'Hello'
@@ -0,0 +1,70 @@
+import itertools
+from unittest.mock import Mock
+
+from gptman.assistant.uploads import UploadIndex, expand_paths, upload_files
+
+
+def make_client():
+    client = Mock()
+    counter = itertools.count()
+    client.files.create.side_effect = lambda **kwargs: Mock(id=f'file_{next(counter)}')
+    client.files.retrieve.side_effect = lambda file_id: Mock(id=file_id)
+    return client
+
+
+def test_expand_paths(tmp_path):
+    (tmp_path / 'a.txt').write_text('a')
+    (tmp_path / 'b.txt').write_text('b')
+    (tmp_path / 'c.md').write_text('c')
+
+    assert expand_paths(f'{tmp_path}/*.txt "{tmp_path}/missing file.md"') == [
+        str(tmp_path / 'a.txt'),
+        str(tmp_path / 'b.txt'),
+        str(tmp_path / 'missing file.md'),
+    ]
+
+
+def test_upload_files_deduplicates(tmp_path):
+    paths = []
+    for name, content in [('a.txt', 'same'), ('b.txt', 'other'), ('c.txt', 'same')]:
+        (tmp_path / name).write_text(content)
+        paths.append(tmp_path / name)
+    index = UploadIndex(tmp_path / 'uploads.json')
+    client = make_client()
+
+    # One job, so the file ids are assigned in order
+    results = [outcome.result for outcome in upload_files(client, paths[:2], index=index, jobs=1)]
+    assert results == [('file_0', False), ('file_1', False)]
+    client.files.retrieve.assert_not_called()
+
+    results = [outcome.result for outcome in upload_files(client, paths, index=UploadIndex(index.path))]
+    assert results == [('file_0', True), ('file_1', True), ('file_0', True)]
+    assert client.files.create.call_count == 2
+    assert sorted(call.args[0] for call in client.files.retrieve.call_args_list) == ['file_0', 'file_1']
+    client.files.list.assert_not_called()
+
+
+def test_upload_files_replaces_deleted_files(tmp_path):
+    path = tmp_path / 'a.txt'
+    path.write_text('a')
+    index = UploadIndex(tmp_path / 'uploads.json')
+    client = make_client()
+    list(upload_files(client, [path], index=index))
+
+    client.files.retrieve.side_effect = Exception('No such file')
+    results = [outcome.result for outcome in upload_files(client, [path], index=index)]
+    assert results == [('file_1', False)]
+
+
+def test_upload_files_uploads_same_content_once(tmp_path):
+    paths = []
+    for name, content in [('a.txt', 'same'), ('b.txt', 'other'), ('c.txt', 'same')]:
+        (tmp_path / name).write_text(content)
+        paths.append(tmp_path / name)
+    client = make_client()
+
+    outcomes = list(upload_files(client, paths, index=UploadIndex(tmp_path / 'uploads.json'), jobs=1))
+
+    assert [outcome.item for outcome in outcomes] == paths
+    assert [outcome.result for outcome in outcomes] == [('file_0', False), ('file_1', False), ('file_0', True)]
+    assert client.files.create.call_count == 2
@@ -0,0 +1,122 @@
+import itertools
+from unittest.mock import Mock, patch
+
+import pytest
+
+from gptman import vectorstore
+from gptman.vectorstore import find_documents, plan_sync, read_manifest, manifest_path, sync_directory
+
+
+def make_client():
+    client = Mock()
+    counter = itertools.count()
+    client.files.create.side_effect = lambda **kwargs: Mock(id=f'file_{next(counter)}')
+    client.vector_stores.file_batches.create_and_poll.return_value = Mock(
+        file_counts=Mock(failed=0, cancelled=0))
+    return client
+
+
+def test_find_documents_skips_hidden_directories(tmp_path):
+    (tmp_path / '.gptman').mkdir()
+    (tmp_path / '.gptman' / 'state.json').write_text('{}')
+    (tmp_path / 'a.md').write_text('a')
+
+    assert find_documents(tmp_path) == ['a.md']
+
+
+def test_plan_sync(tmp_path):
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'docs' / 'a.md').write_text('a')
+    (tmp_path / 'b.txt').write_text('b')
+    (tmp_path / 'image.png').write_bytes(b'png')
+
+    to_upload, to_remove = plan_sync(tmp_path, {})
+    assert sorted(to_upload) == ['b.txt', 'docs/a.md']
+    assert to_remove == []
+
+    manifest = {path: {'sha256': digest, 'file_id': path} for path, digest in to_upload.items()}
+    manifest['deleted.txt'] = {'sha256': 'digest', 'file_id': 'file_deleted'}
+    (tmp_path / 'b.txt').write_text('changed')
+
+    to_upload, to_remove = plan_sync(tmp_path, manifest)
+    assert list(to_upload) == ['b.txt']
+    assert sorted(to_remove) == ['b.txt', 'deleted.txt']
+
+
+def test_sync_directory(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    corpus = tmp_path / 'corpus'
+    corpus.mkdir()
+    (corpus / 'a.md').write_text('a')
+    (corpus / 'b.md').write_text('b')
+    client = make_client()
+
+    assert sync_directory(client, 'vs_a', corpus) == {'uploaded': 2, 'removed': 0, 'failed': 0}
+    client.vector_stores.file_batches.create_and_poll.assert_called_once_with(
+        'vs_a', file_ids=['file_0', 'file_1'])
+
+    assert sync_directory(client, 'vs_a', corpus) == {'uploaded': 0, 'removed': 0, 'failed': 0}
+
+    (corpus / 'b.md').unlink()
+    assert sync_directory(client, 'vs_a', corpus) == {'uploaded': 0, 'removed': 1, 'failed': 0}
+    client.vector_stores.files.delete.assert_called_once_with('file_1', vector_store_id='vs_a')
+    client.files.delete.assert_called_once_with('file_1')
+    assert list(read_manifest(manifest_path('vs_a'))) == ['a.md']
+
+
+def test_sync_directory_replaces_changed_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    corpus = tmp_path / 'corpus'
+    corpus.mkdir()
+    (corpus / 'a.md').write_text('a')
+    client = make_client()
+    sync_directory(client, 'vs_a', corpus)
+
+    calls = []
+
+    def create_and_poll(vector_store_id, file_ids):
+        calls.append(f'add {file_ids[0]}')
+        return Mock(file_counts=Mock(failed=0, cancelled=0))
+
+    client.vector_stores.file_batches.create_and_poll.side_effect = create_and_poll
+    client.files.delete.side_effect = lambda file_id: calls.append(f'delete {file_id}')
+
+    (corpus / 'a.md').write_text('changed')
+    assert sync_directory(client, 'vs_a', corpus) == {'uploaded': 1, 'removed': 1, 'failed': 0}
+    assert calls == ['add file_1', 'delete file_0']
+    assert read_manifest(manifest_path('vs_a'))['a.md']['file_id'] == 'file_1'
+
+
+def test_sync_directory_records_each_batch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    corpus = tmp_path / 'corpus'
+    corpus.mkdir()
+    for name in 'abc':
+        (corpus / f'{name}.md').write_text(name)
+    client = make_client()
+    batch = Mock(file_counts=Mock(failed=0, cancelled=0))
+    client.vector_stores.file_batches.create_and_poll.side_effect = [batch, Exception('Interrupted')]
+
+    with patch.object(vectorstore, 'BATCH_SIZE', 2), pytest.raises(Exception, match='Interrupted'):
+        sync_directory(client, 'vs_a', corpus)
+
+    assert sorted(read_manifest(manifest_path('vs_a'))) == ['a.md', 'b.md']
+    # The upload of the failed batch is not left behind
+    client.files.delete.assert_called_once_with('file_2')
+
+
+def test_sync_directory_skips_cancelled_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    corpus = tmp_path / 'corpus'
+    corpus.mkdir()
+    (corpus / 'a.md').write_text('a')
+    (corpus / 'b.md').write_text('b')
+    client = make_client()
+    client.vector_stores.file_batches.create_and_poll.return_value = Mock(
+        file_counts=Mock(failed=0, cancelled=1))
+    client.vector_stores.file_batches.list_files.side_effect = lambda *args, **kwargs: (
+        [Mock(id='file_1')] if kwargs['filter'] == 'cancelled' else [])
+
+    assert sync_directory(client, 'vs_a', corpus) == {'uploaded': 1, 'removed': 0, 'failed': 1}
+    assert list(read_manifest(manifest_path('vs_a'))) == ['a.md']
+    client.files.delete.assert_called_once_with('file_1')
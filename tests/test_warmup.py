@@ -0,0 +1,35 @@
+import itertools
+from unittest.mock import Mock
+
+from gptman.assistant.warmup import WarmThreadPool
+
+
+def make_client():
+    client = Mock()
+    counter = itertools.count()
+    client.beta.threads.create.side_effect = lambda: Mock(id=f'thread_{next(counter)}')
+    return client
+
+
+class TestWarmThreadPool:
+    def test_acquire_and_close(self):
+        client = make_client()
+        pool = WarmThreadPool(client, size=2)
+        pool.executor.submit(lambda: None).result()
+        assert client.beta.threads.create.call_count == 2
+
+        assert pool.acquire().id == 'thread_0'
+        pool.executor.submit(lambda: None).result()
+        pool.close()
+
+        assert client.beta.threads.create.call_count == 3
+        assert sorted(call.args[0] for call in client.beta.threads.delete.call_args_list) == [
+            'thread_1', 'thread_2',
+        ]
+
+    def test_acquire_from_empty_pool(self):
+        client = make_client()
+        pool = WarmThreadPool(client, size=0)
+        assert pool.acquire().id == 'thread_0'
+        pool.close()
+        client.beta.threads.delete.assert_not_called()
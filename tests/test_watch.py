@@ -0,0 +1,32 @@
+import os
+import time
+import queue
+
+from gptman.assistant.watch import collect_changes, start_polling
+
+
+def test_collect_changes_debounces():
+    changes = queue.Queue()
+    for path in ['a.md', 'b.md', 'a.md']:
+        changes.put(path)
+
+    assert collect_changes(changes, debounce=0.01) == {'a.md', 'b.md'}
+    assert collect_changes(changes, debounce=0.01, timeout=0.01) == set()
+
+
+def test_polling_detects_modified_and_created_files(tmp_path):
+    (tmp_path / 'a.md').write_text('a')
+    (tmp_path / 'b.md').write_text('b')
+    changes = queue.Queue()
+
+    stop = start_polling(str(tmp_path), None, None, changes, interval=0.01)
+    try:
+        time.sleep(0.05)
+        (tmp_path / 'a.md').write_text('changed')
+        os.utime(tmp_path / 'a.md', ns=(0, 1))
+        (tmp_path / 'c.md').write_text('c')
+        (tmp_path / 'c.txt').write_text('c')
+
+        assert collect_changes(changes, debounce=0.1, timeout=1) == {'a.md', 'c.md'}
+    finally:
+        stop()
@@ -0,0 +1,24 @@
+import time
+
+from gptman.workers import imap_ordered
+
+
+def slow_square(n):
+    time.sleep(0.01 * (5 - n))
+    if n == 3:
+        raise ValueError(n)
+    return n * n
+
+
+class TestImapOrdered:
+    def test_sequential(self):
+        outcomes = list(imap_ordered(slow_square, range(5)))
+        assert [o.item for o in outcomes] == [0, 1, 2, 3, 4]
+        assert [o.result for o in outcomes] == [0, 1, 4, None, 16]
+        assert isinstance(outcomes[3].error, ValueError)
+
+    def test_concurrent_keeps_order(self):
+        outcomes = list(imap_ordered(slow_square, range(5), jobs=4))
+        assert [o.item for o in outcomes] == [0, 1, 2, 3, 4]
+        assert [o.result for o in outcomes] == [0, 1, 4, None, 16]
+        assert isinstance(outcomes[3].error, ValueError)